@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, Schedule, Task, ProgressTracker, JKUATTimetable, ResourceCategory, ActivityResource, UserResourcePreference
+from .models import UserProfile, Schedule, Task, ProgressTracker, ProductivityRollup, SmartSuggestion, Habit, ChatRoom, ChatMessage, JKUATTimetable, ResourceCategory, ActivityResource, UserResourcePreference
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -29,6 +29,42 @@ class ProgressTrackerAdmin(admin.ModelAdmin):
     search_fields = ['user__username']
     readonly_fields = ['created_at', 'id']
 
+@admin.register(ProductivityRollup)
+class ProductivityRollupAdmin(admin.ModelAdmin):
+    list_display = ['user', 'period', 'period_start', 'tasks_completed', 'study_hours', 'avg_productivity']
+    list_filter = ['period', 'period_start']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at', 'id']
+
+@admin.register(SmartSuggestion)
+class SmartSuggestionAdmin(admin.ModelAdmin):
+    list_display = ['title', 'user', 'suggestion_type', 'period', 'confidence_score', 'is_dismissed']
+    list_filter = ['suggestion_type', 'period', 'is_dismissed']
+    search_fields = ['title', 'user__username']
+    readonly_fields = ['created_at', 'updated_at', 'id']
+
+@admin.register(Habit)
+class HabitAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'is_active', 'current_streak', 'longest_streak', 'last_completed_on']
+    list_filter = ['is_active', 'category']
+    search_fields = ['name', 'user__username']
+    readonly_fields = ['created_at', 'updated_at', 'id', 'history_start', 'completion_bitmap', 'total_completions']
+
+@admin.register(ChatRoom)
+class ChatRoomAdmin(admin.ModelAdmin):
+    list_display = ['name', 'room_type', 'created_by', 'is_active', 'created_at']
+    list_filter = ['room_type', 'is_active']
+    search_fields = ['name', 'created_by__username']
+    filter_horizontal = ['participants']
+    readonly_fields = ['created_at', 'updated_at', 'id']
+
+@admin.register(ChatMessage)
+class ChatMessageAdmin(admin.ModelAdmin):
+    list_display = ['room', 'sender', 'created_at', 'is_edited']
+    search_fields = ['content', 'sender__username']
+    raw_id_fields = ['room', 'sender']
+    readonly_fields = ['created_at', 'updated_at', 'id']
+
 @admin.register(JKUATTimetable)
 class JKUATTimetableAdmin(admin.ModelAdmin):
     list_display = ['user', 'day', 'start_time', 'end_time', 'course_code', 'venue', 'is_active']
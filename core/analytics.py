@@ -0,0 +1,354 @@
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Min, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+import logging
+
+from .models import JobCheckpoint, ProgressTracker, ProductivityRollup, SmartSuggestion, Task, UserProfile
+
+logger = logging.getLogger(__name__)
+
+
+class ProductivityRollups:
+    """Set-based daily and weekly rollups of ProgressTracker.
+
+    Each run finds the users whose progress rows changed since the stored
+    watermark, recomputes their day and week aggregates with one GROUP BY per
+    period, and writes them with a bulk upsert keyed on (user, period,
+    period_start). Only weeks touched by a change are recomputed, so an idle
+    hour costs a single indexed query no matter how many users exist.
+    """
+
+    CHECKPOINT_NAME = 'productivity_rollups'
+    USER_BATCH_SIZE = 500
+    # Re-read a little before the watermark so rows committed late are not missed
+    WATERMARK_OVERLAP = timedelta(minutes=5)
+
+    AGGREGATES = {
+        'days_tracked': Count('id'),
+        'tasks_completed': Sum('tasks_completed'),
+        'study_hours': Sum('study_hours'),
+        'avg_productivity': Avg('productivity_score'),
+        'avg_consistency': Avg('consistency_score'),
+    }
+
+    def run(self, full=False):
+        """Refresh rollups for changed users, returning the number of rows upserted"""
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=self.CHECKPOINT_NAME)
+        started = timezone.now()
+
+        changed = ProgressTracker.objects.all()
+        if checkpoint.watermark and not full:
+            changed = changed.filter(updated_at__gt=checkpoint.watermark - self.WATERMARK_OVERLAP)
+
+        # Earliest changed day per user; everything from that week on is rebuilt
+        dirty = dict(changed.values('user_id').annotate(first_day=Min('date')).values_list('user_id', 'first_day'))
+
+        written = 0
+        user_ids = list(dirty)
+        for offset in range(0, len(user_ids), self.USER_BATCH_SIZE):
+            batch = {user_id: dirty[user_id] for user_id in user_ids[offset:offset + self.USER_BATCH_SIZE]}
+            written += self._rollup(batch)
+
+        checkpoint.watermark = started
+        checkpoint.state = {'users': len(dirty), 'rows': written, 'full': full}
+        checkpoint.save()
+
+        logger.info(f"Productivity rollups refreshed for {len(dirty)} users ({written} rows)")
+        return written
+
+    def refresh_user(self, user_id, since=None):
+        """Recompute one user's day and week rollups from `since` (default: this week) straight away"""
+        return self._rollup({user_id: since or _week_start(timezone.localdate())})
+
+    def _rollup(self, dirty):
+        since = _week_start(min(dirty.values()))
+        source = ProgressTracker.objects.filter(user_id__in=list(dirty), date__gte=since)
+
+        daily = source.values('user_id', 'date').annotate(**self.AGGREGATES)
+        weekly = source.annotate(week=TruncWeek('date')).values('user_id', 'week').annotate(**self.AGGREGATES)
+
+        rollups = []
+        for row in daily:
+            if row['date'] >= dirty[row['user_id']]:
+                rollups.append(self._build(row, 'day', row['date']))
+        for row in weekly:
+            if row['week'] >= _week_start(dirty[row['user_id']]):
+                rollups.append(self._build(row, 'week', row['week']))
+
+        ProductivityRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['user', 'period', 'period_start'],
+            update_fields=list(self.AGGREGATES) + ['updated_at'],
+            batch_size=500
+        )
+        return len(rollups)
+
+    def _build(self, row, period, period_start):
+        return ProductivityRollup(
+            user_id=row['user_id'],
+            period=period,
+            period_start=period_start,
+            days_tracked=row['days_tracked'],
+            tasks_completed=row['tasks_completed'] or 0,
+            study_hours=row['study_hours'] or 0.0,
+            avg_productivity=row['avg_productivity'] or 0.0,
+            avg_consistency=row['avg_consistency'] or 0.0,
+            updated_at=timezone.now()
+        )
+
+
+class SmartSuggestionEngine:
+    """Watermarked, set-based generation of daily smart suggestions.
+
+    Suggestions are keyed by (user, type, day). Within a day only users whose
+    progress or tasks changed since the last run are re-evaluated; the first
+    run of a new day re-evaluates everyone, since the 7-day window and the set
+    of overdue tasks both move with the date. Averages and overdue counts come
+    from one aggregated query each per batch of users.
+    """
+
+    CHECKPOINT_NAME = 'smart_suggestions'
+    USER_BATCH_SIZE = 500
+    WATERMARK_OVERLAP = timedelta(minutes=5)
+    WINDOW_DAYS = 7
+    OPEN_STATUSES = ['todo', 'in_progress']
+
+    def run(self, today=None):
+        """Refresh today's suggestions, returning the number of users evaluated"""
+        today = today or timezone.localdate()
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=self.CHECKPOINT_NAME)
+        started = timezone.now()
+        full = not checkpoint.watermark or checkpoint.state.get('day') != today.isoformat()
+
+        window_start = today - timedelta(days=self.WINDOW_DAYS)
+        if full:
+            user_ids = self._active_users(today, window_start)
+        else:
+            since = checkpoint.watermark - self.WATERMARK_OVERLAP
+            user_ids = set(ProgressTracker.objects.filter(updated_at__gt=since).values_list('user_id', flat=True))
+            user_ids.update(Task.objects.filter(updated_at__gt=since).values_list('user_id', flat=True))
+
+        user_ids = sorted(user_ids)
+        for offset in range(0, len(user_ids), self.USER_BATCH_SIZE):
+            self._evaluate(user_ids[offset:offset + self.USER_BATCH_SIZE], today, window_start)
+
+        checkpoint.watermark = started
+        checkpoint.state = {'day': today.isoformat(), 'users': len(user_ids), 'full': full}
+        checkpoint.save()
+
+        logger.info(f"Smart suggestions evaluated for {len(user_ids)} users (full={full})")
+        return len(user_ids)
+
+    def _active_users(self, today, window_start):
+        user_ids = set(
+            ProgressTracker.objects.filter(date__gte=window_start).values_list('user_id', flat=True).distinct()
+        )
+        user_ids.update(
+            Task.objects.filter(due_date__lt=today, status__in=self.OPEN_STATUSES)
+            .values_list('user_id', flat=True).distinct()
+        )
+        # Users with suggestions from an earlier day need nothing; today's rows may need clearing
+        user_ids.update(SmartSuggestion.objects.filter(period=today).values_list('user_id', flat=True))
+        return user_ids
+
+    def _evaluate(self, user_ids, today, window_start):
+        averages = {
+            row['user_id']: row
+            for row in ProgressTracker.objects.filter(user_id__in=user_ids, date__gte=window_start)
+            .values('user_id')
+            .annotate(productivity=Avg('productivity_score'), study_hours=Avg('study_hours'))
+        }
+        overdue = dict(
+            Task.objects.filter(user_id__in=user_ids, due_date__lt=today, status__in=self.OPEN_STATUSES)
+            .values('user_id')
+            .annotate(overdue=Count('id'))
+            .values_list('user_id', 'overdue')
+        )
+
+        suggestions = []
+        for user_id in user_ids:
+            suggestions.extend(self._suggestions_for(user_id, today, averages.get(user_id), overdue.get(user_id, 0)))
+
+        SmartSuggestion.objects.bulk_create(
+            suggestions,
+            update_conflicts=True,
+            unique_fields=['user', 'suggestion_type', 'period'],
+            update_fields=['title', 'description', 'confidence_score', 'updated_at'],
+            batch_size=500
+        )
+
+        # Drop today's suggestions whose condition no longer holds
+        kept = {}
+        for suggestion in suggestions:
+            kept.setdefault(suggestion.suggestion_type, []).append(suggestion.user_id)
+        for suggestion_type, _ in SmartSuggestion.SUGGESTION_TYPES:
+            SmartSuggestion.objects.filter(
+                user_id__in=user_ids,
+                suggestion_type=suggestion_type,
+                period=today
+            ).exclude(user_id__in=kept.get(suggestion_type, [])).delete()
+
+    def _suggestions_for(self, user_id, today, averages, overdue):
+        now = timezone.now()
+        suggestions = []
+
+        if averages:
+            if averages['productivity'] < 50:
+                suggestions.append(SmartSuggestion(
+                    user_id=user_id,
+                    suggestion_type='productivity_tip',
+                    period=today,
+                    title='Boost Your Productivity',
+                    description=f"Your average productivity is {averages['productivity']:.1f}%. Try time blocking technique.",
+                    confidence_score=0.8,
+                    updated_at=now
+                ))
+
+            if averages['study_hours'] < 3:
+                suggestions.append(SmartSuggestion(
+                    user_id=user_id,
+                    suggestion_type='study_recommendation',
+                    period=today,
+                    title='Increase Study Consistency',
+                    description=f"You study {averages['study_hours']:.1f} hours daily. Consider adding focused study sessions.",
+                    confidence_score=0.7,
+                    updated_at=now
+                ))
+
+        if overdue:
+            suggestions.append(SmartSuggestion(
+                user_id=user_id,
+                suggestion_type='time_optimization',
+                period=today,
+                title='Overdue Tasks Alert',
+                description=f'You have {overdue} overdue tasks. Consider rescheduling or prioritizing.',
+                confidence_score=0.9,
+                updated_at=now
+            ))
+
+        return suggestions
+
+
+class LiveAnalytics:
+    """Per-user weekly analytics for the analytics websocket.
+
+    The snapshot a client sees on connect comes from the user's current-week
+    ProductivityRollup and is cached, so connecting costs no aggregate
+    queries. When progress or the streak changes, changed() schedules one
+    debounced refresh: the user's day and week rollups are recomputed, the
+    cached snapshot replaced, and only the metrics that moved are pushed to
+    the user's sockets as an analytics_update.
+    """
+
+    CACHE_TIMEOUT = 24 * 60 * 60  # 1 day
+    REFRESH_DELAY = 2  # seconds; events within this window share one refresh
+
+    @classmethod
+    def group_name(cls, user_id):
+        return f'analytics_{user_id}'
+
+    @classmethod
+    def snapshot(cls, user_id):
+        """Cached weekly metrics for a user, built from the rollups on a miss"""
+        try:
+            data = cache.get(cls._cache_key(user_id))
+        except Exception as e:
+            logger.warning(f"Analytics cache unavailable, loading from database: {e}")
+            return cls.build(user_id)
+
+        if data is None or data['week_start'] != _week_start(timezone.localdate()).isoformat():
+            data = cls.build(user_id)
+            cls._store(user_id, data)
+        return data
+
+    @staticmethod
+    def build(user_id):
+        week_start = _week_start(timezone.localdate())
+        rollup = ProductivityRollup.objects.filter(
+            user_id=user_id, period='week', period_start=week_start
+        ).values('study_hours', 'avg_productivity', 'tasks_completed').first() or {}
+        streak = UserProfile.objects.filter(user_id=user_id).values_list('streak_count', flat=True).first()
+
+        return {
+            'week_start': week_start.isoformat(),
+            'weekly_study_hours': round(rollup.get('study_hours', 0.0), 1),
+            'weekly_productivity': round(rollup.get('avg_productivity', 0.0), 1),
+            'weekly_tasks_completed': rollup.get('tasks_completed', 0),
+            'current_streak': streak or 0,
+        }
+
+    @classmethod
+    def changed(cls, user_id):
+        """Schedule a refresh for the user once the surrounding transaction commits"""
+        transaction.on_commit(lambda: cls._schedule(user_id))
+
+    @classmethod
+    def refresh(cls, user_id):
+        """Recompute the user's rollups and push the metrics that changed, returning them"""
+        try:
+            cache.delete(cls._pending_key(user_id))
+        except Exception as e:
+            logger.warning(f"Could not clear analytics refresh flag for user {user_id}: {e}")
+
+        ProductivityRollups().refresh_user(user_id)
+        data = cls.build(user_id)
+        try:
+            previous = cache.get(cls._cache_key(user_id))
+        except Exception:
+            previous = None
+        cls._store(user_id, data)
+
+        delta = {key: value for key, value in data.items() if not previous or previous.get(key) != value}
+        if delta:
+            channel_layer = get_channel_layer()
+            if channel_layer is not None:
+                try:
+                    async_to_sync(channel_layer.group_send)(
+                        cls.group_name(user_id), {'type': 'analytics_update', 'data': delta}
+                    )
+                except Exception as e:
+                    logger.warning(f"Analytics publish failed for user {user_id}: {e}")
+        return delta
+
+    @classmethod
+    def _schedule(cls, user_id):
+        from .tasks import refresh_live_analytics
+
+        try:
+            claimed = cache.add(cls._pending_key(user_id), 1, cls.REFRESH_DELAY + 30)
+        except Exception as e:
+            logger.warning(f"Analytics cache unavailable, refreshing without debounce: {e}")
+            claimed = True
+        if not claimed:
+            return
+        try:
+            refresh_live_analytics.apply_async((user_id,), countdown=cls.REFRESH_DELAY)
+        except Exception as e:
+            # A broker outage must not fail the save that triggered this
+            logger.warning(f"Could not schedule analytics refresh for user {user_id}: {e}")
+
+    @classmethod
+    def _store(cls, user_id, data):
+        try:
+            cache.set(cls._cache_key(user_id), data, cls.CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Could not cache analytics for user {user_id}: {e}")
+
+    @staticmethod
+    def _cache_key(user_id):
+        return f'live_analytics:{user_id}'
+
+    @staticmethod
+    def _pending_key(user_id):
+        return f'live_analytics:{user_id}:pending'
+
+
+def _week_start(day):
+    """Monday of the week containing day, matching TruncWeek"""
+    return day - timedelta(days=day.weekday())
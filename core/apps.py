@@ -5,4 +5,5 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
-        import core.signals  # Connect signals
\ No newline at end of file
+        import core.signals  # Connect signals
+        import core.telemetry  # Connect Celery task instrumentation
\ No newline at end of file
@@ -0,0 +1,306 @@
+from datetime import datetime
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+import logging
+import uuid
+
+from .models import ChatMessage, ChatReadState, ChatRoom
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRooms:
+    """Cached room details and participant ids.
+
+    Connecting to a room needs its info and a membership check; both are
+    served from one cache entry per room, built with two queries on a miss.
+    Saving or deleting the room, or changing its participants, drops the
+    entry (see core.signals).
+    """
+
+    CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+    @classmethod
+    def info(cls, room_id):
+        """Room details plus 'participant_ids' and 'participant_names', or None if the room does not exist"""
+        key = cls._cache_key(room_id)
+        try:
+            info = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Chat room cache unavailable, loading from database: {e}")
+            return cls._load(room_id)
+
+        if info is None:
+            info = cls._load(room_id)
+            if info is not None:
+                try:
+                    cache.set(key, info, cls.CACHE_TIMEOUT)
+                except Exception as e:
+                    logger.warning(f"Could not cache chat room {room_id}: {e}")
+        return info
+
+    @classmethod
+    def is_participant(cls, room_id, user_id):
+        info = cls.info(room_id)
+        return bool(info and info['is_active'] and user_id in info['participant_ids'])
+
+    @classmethod
+    def invalidate(cls, room_id):
+        try:
+            cache.delete(cls._cache_key(room_id))
+        except Exception as e:
+            logger.warning(f"Could not invalidate chat room {room_id}: {e}")
+
+    @staticmethod
+    def _load(room_id):
+        room = ChatRoom.objects.filter(id=room_id).values(
+            'id', 'name', 'description', 'room_type', 'is_active', 'created_by__username'
+        ).first()
+        if room is None:
+            return None
+
+        participants = dict(
+            ChatRoom.participants.through.objects.filter(chatroom_id=room_id).values_list('user_id', 'user__username')
+        )
+        participant_ids = list(participants)
+        return {
+            'id': str(room['id']),
+            'name': room['name'],
+            'description': room['description'],
+            'room_type': room['room_type'],
+            'is_active': room['is_active'],
+            'created_by': room['created_by__username'],
+            'participant_ids': participant_ids,
+            'participant_names': participants,
+            'participant_count': len(participant_ids),
+        }
+
+    @staticmethod
+    def _cache_key(room_id):
+        return f'chat_room:{room_id}'
+
+
+class ChatHistory:
+    """Keyset-paginated message history for a room.
+
+    Pages are read newest first along the (room, created_at, id) index and
+    returned in chronological order. The cursor is the (created_at, id) of the
+    oldest message on the page, so fetching further back is an index range
+    scan no matter how deep the user scrolls, and messages arriving meanwhile
+    never shift the pages.
+    """
+
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
+    FIELDS = [
+        'id', 'content', 'is_edited', 'created_at',
+        'sender_id', 'sender__username', 'sender__first_name', 'sender__last_name',
+    ]
+
+    @classmethod
+    def page(cls, room_id, before=None, limit=None):
+        """Return (messages oldest first, cursor for the page before them or None)"""
+        limit = min(max(int(limit or cls.PAGE_SIZE), 1), cls.MAX_PAGE_SIZE)
+
+        messages = ChatMessage.objects.filter(room_id=room_id)
+        if before:
+            created_at, message_id = cls.decode_cursor(before)
+            messages = messages.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id)
+            )
+
+        # One extra row tells whether there is anything older
+        rows = list(messages.order_by('-created_at', '-id').values(*cls.FIELDS)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        rows.reverse()
+
+        cursor = cls.encode_cursor(rows[0]['created_at'], rows[0]['id']) if has_more else None
+        return [cls.serialize(row) for row in rows], cursor
+
+    @staticmethod
+    def serialize(row):
+        return {
+            'id': str(row['id']),
+            'content': row['content'],
+            'sender': {
+                'id': row['sender_id'],
+                'username': row['sender__username'],
+                'first_name': row['sender__first_name'],
+                'last_name': row['sender__last_name'],
+            },
+            'timestamp': row['created_at'].isoformat(),
+            'is_edited': row['is_edited'],
+        }
+
+    @staticmethod
+    def encode_cursor(created_at, message_id):
+        return f'{created_at.isoformat()}|{message_id}'
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Split a cursor into (created_at, id), raising ValueError if it is malformed"""
+        created_at, _, message_id = str(cursor).partition('|')
+        return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+
+
+class ChatReads:
+    """Per-(user, room) read watermarks.
+
+    Reading a message marks everything up to it as read, so read state is one
+    ChatReadState row per user per room instead of one receipt per message.
+    The watermark is the (created_at, id) of the newest message read and is
+    moved with a single conditional UPDATE that only ever advances it, so
+    concurrent or out-of-order read events cannot move it backwards. Unread
+    counts are the messages from other people past the watermark.
+    """
+
+    @classmethod
+    def mark_read(cls, user_id, room_id, message_ids):
+        """Advance the user's watermark to the newest of the given messages in the room"""
+        newest = (
+            ChatMessage.objects.filter(room_id=room_id, id__in=message_ids)
+            .order_by('-created_at', '-id')
+            .values_list('created_at', 'id')
+            .first()
+        )
+        if newest is None:
+            return False
+        return cls.advance(user_id, room_id, *newest)
+
+    @classmethod
+    def advance(cls, user_id, room_id, created_at, message_id):
+        """Move the watermark forward to (created_at, message_id); False if it was already there or past it"""
+        behind = Q(last_read_at__isnull=True) | Q(last_read_at__lt=created_at) | Q(
+            last_read_at=created_at, last_read_message_id__lt=message_id
+        )
+        values = {'last_read_at': created_at, 'last_read_message_id': message_id, 'updated_at': timezone.now()}
+        state = ChatReadState.objects.filter(user_id=user_id, room_id=room_id)
+
+        if state.filter(behind).update(**values):
+            return True
+
+        # No row moved: either the watermark is already past this message or
+        # there is no row yet. get_or_create absorbs a row another connection
+        # inserts meanwhile, and the conditional UPDATE runs again either way
+        ChatReadState.objects.get_or_create(user_id=user_id, room_id=room_id)
+        return bool(state.filter(behind).update(**values))
+
+    @classmethod
+    def unread_count(cls, user_id, room_id):
+        """Messages from others past the user's watermark, counted along the (room, created_at, id) index"""
+        watermark = (
+            ChatReadState.objects.filter(user_id=user_id, room_id=room_id)
+            .values_list('last_read_at', 'last_read_message_id')
+            .first()
+        )
+        messages = ChatMessage.objects.filter(room_id=room_id).exclude(sender_id=user_id)
+        if watermark and watermark[0]:
+            messages = messages.filter(cls._after(*watermark))
+        return messages.count()
+
+    @staticmethod
+    def _after(read_at, read_id):
+        """Messages after the (read_at, read_id) watermark in (created_at, id) order"""
+        if read_id is None:
+            # The watermark message was deleted; its timestamp still marks the position
+            return Q(created_at__gt=read_at)
+        return Q(created_at__gt=read_at) | Q(created_at=read_at, id__gt=read_id)
+
+
+class RoomPresence:
+    """Who is connected to each chat room, shared between workers through the cache.
+
+    Every user in a room has an atomic connection counter, so several tabs
+    count once and a closing tab does not hide the others. Counters expire
+    after TIMEOUT unless an open connection refreshes them (HEARTBEAT), so
+    connections lost with a crashed worker eventually drop out. Rather than fanning
+    out an event per join and leave, changes mark the room for a presence
+    broadcast; the first connection to claim the mark sends one snapshot of
+    everyone online after a short delay, covering every change made meanwhile.
+    """
+
+    TIMEOUT = 60 * 60  # a crashed worker's connections fall off after an hour
+    HEARTBEAT = 15 * 60  # open connections refresh their counter this often
+
+    @classmethod
+    def join(cls, room_id, user_id):
+        key = cls._user_key(room_id, user_id)
+        try:
+            try:
+                cache.incr(key)
+                # incr keeps the old expiry; every join pushes it out again
+                cache.touch(key, cls.TIMEOUT)
+            except ValueError:
+                if not cache.add(key, 1, cls.TIMEOUT):
+                    cache.incr(key)
+        except Exception as e:
+            logger.warning(f"Could not record presence in room {room_id}: {e}")
+
+    @classmethod
+    def heartbeat(cls, room_id, user_id):
+        """Keep an open connection's counter from expiring, restoring it if it already has"""
+        key = cls._user_key(room_id, user_id)
+        try:
+            if not cache.touch(key, cls.TIMEOUT):
+                cache.add(key, 1, cls.TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Could not refresh presence in room {room_id}: {e}")
+
+    @classmethod
+    def leave(cls, room_id, user_id):
+        key = cls._user_key(room_id, user_id)
+        try:
+            if cache.decr(key) <= 0:
+                cache.delete(key)
+        except ValueError:
+            # Counter already expired
+            pass
+        except Exception as e:
+            logger.warning(f"Could not record presence in room {room_id}: {e}")
+
+    @classmethod
+    def online(cls, room_id, participant_ids):
+        """Participant ids with at least one open connection to the room"""
+        keys = {cls._user_key(room_id, user_id): user_id for user_id in participant_ids}
+        try:
+            counts = cache.get_many(list(keys))
+        except Exception as e:
+            logger.warning(f"Presence unavailable for room {room_id}: {e}")
+            return []
+        return sorted(keys[key] for key, count in counts.items() if count and count > 0)
+
+    @classmethod
+    def claim_broadcast(cls, room_id, delay):
+        """True for the one caller that should send the next snapshot for the room"""
+        try:
+            return cache.add(cls._pending_key(room_id), 1, int(delay) + 5)
+        except Exception as e:
+            logger.warning(f"Presence unavailable for room {room_id}: {e}")
+            return False
+
+    @classmethod
+    def release_broadcast(cls, room_id):
+        try:
+            cache.delete(cls._pending_key(room_id))
+        except Exception as e:
+            logger.warning(f"Could not release presence broadcast for room {room_id}: {e}")
+
+    @classmethod
+    def claim_typing(cls, room_id, user_id, window):
+        """True if the user may relay a typing indicator to the room now; one claim per window across tabs"""
+        try:
+            return cache.add(f'typing:{room_id}:{user_id}', 1, window)
+        except Exception as e:
+            logger.warning(f"Typing throttle unavailable for room {room_id}: {e}")
+            return True
+
+    @staticmethod
+    def _user_key(room_id, user_id):
+        return f'chat_presence:{room_id}:{user_id}'
+
+    @staticmethod
+    def _pending_key(room_id):
+        return f'chat_presence:{room_id}:pending'
@@ -0,0 +1,141 @@
+from collections import namedtuple
+from datetime import time, timedelta
+from heapq import heappop, heappush, merge
+from itertools import groupby
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+import logging
+
+from .models import JobCheckpoint, Schedule, UserTimetable, JKUATTimetable, SmartActivity
+
+logger = logging.getLogger(__name__)
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# One timed block from any source, in the order the sweep consumes them
+Block = namedtuple('Block', ['user_id', 'day_index', 'start_time', 'end_time', 'source', 'pk', 'title'])
+
+
+def _day_index():
+    """Weekday position as a SQL expression, so every source sorts days the same way"""
+    return Case(
+        *[When(day=day, then=Value(index)) for index, day in enumerate(DAYS)],
+        default=Value(len(DAYS)),
+        output_field=IntegerField()
+    )
+
+
+class ConflictScanner:
+    """Streaming overlap detection across every timetable source for all users.
+
+    Each source is read with one query ordered by (user, weekday, start time)
+    and streamed in chunks; the streams are merged with heapq.merge and a
+    sweep-line runs over each (user, day) group, keeping only the blocks still
+    in progress. Every overlapping pair is found, not just neighbours, and
+    memory stays bounded by the busiest single day. With changed_only, only
+    users who edited something since the last run are rescanned.
+    """
+
+    CHECKPOINT_NAME = 'schedule_conflicts'
+    CHUNK_SIZE = 2000
+    USER_BATCH_SIZE = 500
+    WATERMARK_OVERLAP = timedelta(minutes=5)
+
+    SOURCES = {
+        'schedule': (Schedule, ['title']),
+        'timetable': (UserTimetable, ['unit_code', 'unit_name']),
+        'jkuat': (JKUATTimetable, ['course_code', 'course_name']),
+        'activity': (SmartActivity, ['title']),
+    }
+
+    def run(self, changed_only=True, on_conflict=None):
+        """Scan for conflicts, calling on_conflict(day, first, second) for each overlapping pair"""
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=self.CHECKPOINT_NAME)
+        started = timezone.now()
+
+        found = 0
+        if changed_only and checkpoint.watermark:
+            user_ids = sorted(self.changed_users(checkpoint.watermark - self.WATERMARK_OVERLAP))
+            for offset in range(0, len(user_ids), self.USER_BATCH_SIZE):
+                found += self._scan(user_ids[offset:offset + self.USER_BATCH_SIZE], on_conflict)
+        else:
+            found += self._scan(None, on_conflict)
+
+        checkpoint.watermark = started
+        checkpoint.state = {'conflicts': found, 'changed_only': changed_only}
+        checkpoint.save()
+
+        logger.info(f"Conflict scan found {found} overlapping pairs")
+        return found
+
+    def changed_users(self, since):
+        user_ids = set()
+        for model, _ in self.SOURCES.values():
+            user_ids.update(model.objects.filter(updated_at__gt=since).values_list('user_id', flat=True).distinct())
+        return user_ids
+
+    def conflicts(self, user_ids=None):
+        """Yield (day, first, second) for every overlapping pair of blocks"""
+        for (_, day_index), blocks in groupby(self.blocks(user_ids), key=lambda block: (block.user_id, block.day_index)):
+            for first, second in self._sweep(blocks):
+                yield DAYS[day_index], first, second
+
+    def blocks(self, user_ids=None):
+        """All active blocks merged into (user, weekday, start time) order"""
+        streams = [self._stream(source, user_ids) for source in self.SOURCES]
+        streams.append(self._daily_stream(user_ids))
+        return merge(*streams, key=lambda block: (block.user_id, block.day_index, block.start_time))
+
+    def _scan(self, user_ids, on_conflict):
+        found = 0
+        for day, first, second in self.conflicts(user_ids):
+            found += 1
+            if on_conflict:
+                on_conflict(day, first, second)
+        return found
+
+    def _queryset(self, source, user_ids):
+        model, _ = self.SOURCES[source]
+        queryset = model.objects.filter(is_active=True)
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+        return queryset
+
+    def _stream(self, source, user_ids):
+        _, title_fields = self.SOURCES[source]
+        rows = (
+            self._queryset(source, user_ids)
+            .exclude(day='daily')
+            .annotate(day_index=_day_index())
+            .order_by('user_id', 'day_index', 'start_time')
+            .values_list('user_id', 'day_index', 'start_time', 'end_time', 'pk', *title_fields)
+        )
+        for user_id, day_index, start_time, end_time, pk, *title in rows.iterator(chunk_size=self.CHUNK_SIZE):
+            yield Block(user_id, day_index, start_time, end_time, source, pk, ' - '.join(title))
+
+    def _daily_stream(self, user_ids):
+        """Expand 'daily' smart activities into one block per weekday, one user at a time"""
+        rows = (
+            self._queryset('activity', user_ids)
+            .filter(day='daily')
+            .order_by('user_id', 'start_time')
+            .values_list('user_id', 'start_time', 'end_time', 'pk', 'title')
+        )
+        for user_id, user_rows in groupby(rows.iterator(chunk_size=self.CHUNK_SIZE), key=lambda row: row[0]):
+            user_rows = list(user_rows)
+            for day_index in range(len(DAYS)):
+                for _, start_time, end_time, pk, title in user_rows:
+                    yield Block(user_id, day_index, start_time, end_time, 'activity', pk, title)
+
+    @staticmethod
+    def _sweep(blocks):
+        """Report every pair of overlapping blocks within one (user, day) group"""
+        active = []  # heap of (end time, sequence, block)
+        for sequence, block in enumerate(blocks):
+            # Blocks that wrap past midnight run to the end of the day
+            end_time = block.end_time if block.end_time >= block.start_time else time.max
+            while active and active[0][0] <= block.start_time:
+                heappop(active)
+            for _, _, earlier in sorted(active, key=lambda entry: entry[1]):
+                yield earlier, block
+            heappush(active, (end_time, sequence, block))
@@ -0,0 +1,159 @@
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+import gzip
+import json
+import logging
+
+from .models import Schedule, SmartActivity, UserTimetable, Task, ProgressTracker, UserResourcePreference
+from notifications.models import Notification
+from notifications.counters import UnreadCounter
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+class UserDataExport:
+    """Streaming export and restore of everything a user owns.
+
+    The export is a gzip-compressed NDJSON file: a header line followed by one
+    line per row, {"model": <label>, "fields": {...}}. Rows are read with
+    .iterator() and written in chunks, so memory stays flat however long the
+    history is. Restoring streams the same file back and inserts each model
+    with bulk_create in batches, skipping rows that already exist. bulk_create
+    stamps auto_now/auto_now_add fields with the restore time, so the exported
+    timestamps are written back to the inserted rows afterwards.
+    """
+
+    # Restore order matters only for readability; none of these reference each other
+    MODELS = {
+        'schedule': Schedule,
+        'smart_activity': SmartActivity,
+        'timetable': UserTimetable,
+        'task': Task,
+        'progress': ProgressTracker,
+        'resource_preference': UserResourcePreference,
+        'notification': Notification,
+    }
+
+    def __init__(self, user, export_dir=None, chunk_size=1000):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.export_dir = Path(export_dir or getattr(settings, 'USER_EXPORT_DIR', settings.BASE_DIR / 'exports'))
+
+    def export(self):
+        """Write the user's data to a new .ndjson.gz file and return its path and row counts"""
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        path = self.export_dir / f'{self.user.username}-{timezone.now():%Y%m%d%H%M%S}.ndjson.gz'
+
+        counts = {}
+        with gzip.open(path, 'wt', encoding='utf-8') as handle:
+            handle.write(json.dumps({
+                'format': FORMAT_VERSION,
+                'username': self.user.username,
+                'exported_at': timezone.now().isoformat(),
+            }) + '\n')
+
+            for label, model in self.MODELS.items():
+                counts[label] = self._write_model(handle, label, model)
+
+        logger.info(f"Exported {sum(counts.values())} rows for {self.user.username} to {path}")
+        return path, counts
+
+    def restore(self, path, batch_size=500):
+        """Insert rows from an export file for this user, returning counts per model"""
+        counts = dict.fromkeys(self.MODELS, 0)
+        pending = {label: [] for label in self.MODELS}
+
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            header = json.loads(handle.readline())
+            if header.get('format') != FORMAT_VERSION:
+                raise ValueError(f"Unsupported export format: {header.get('format')}")
+
+            for line in handle:
+                record = json.loads(line)
+                label = record['model']
+                if label not in self.MODELS:
+                    continue
+
+                pending[label].append(self._build(self.MODELS[label], record['fields']))
+                if len(pending[label]) >= batch_size:
+                    counts[label] += self._insert(label, pending[label])
+                    pending[label] = []
+
+        for label, objects in pending.items():
+            counts[label] += self._insert(label, objects)
+
+        if counts['notification']:
+            # bulk_create skips the signals that keep the unread counter current
+            UnreadCounter.recount(self.user.id)
+
+        logger.info(f"Restored {sum(counts.values())} rows for {self.user.username} from {path}")
+        return counts
+
+    def _write_model(self, handle, label, model):
+        rows = model.objects.filter(user=self.user).order_by('pk').values(*self._fields(model))
+
+        written = 0
+        lines = []
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            lines.append(json.dumps({'model': label, 'fields': row}, cls=DjangoJSONEncoder))
+            if len(lines) >= self.chunk_size:
+                handle.write('\n'.join(lines) + '\n')
+                written += len(lines)
+                lines = []
+
+        if lines:
+            handle.write('\n'.join(lines) + '\n')
+            written += len(lines)
+        return written
+
+    def _build(self, model, values):
+        instance = model(user=self.user)
+        for field in model._meta.concrete_fields:
+            if field.attname in values and field.name != 'user':
+                setattr(instance, field.attname, field.to_python(values[field.attname]))
+        return instance
+
+    def _insert(self, label, objects):
+        if not objects:
+            return 0
+        model = self.MODELS[label]
+        pks = [obj.pk for obj in objects]
+        # Rows already present (same primary key or unique key) are left untouched
+        existing = set(model.objects.filter(pk__in=pks).values_list('pk', flat=True))
+        timestamp_fields = self._timestamp_fields(model)
+        exported = {obj.pk: [getattr(obj, name) for name in timestamp_fields] for obj in objects}
+
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+
+        # ignore_conflicts also skips rows clashing on other unique keys, so
+        # count what is actually there now rather than what was sent
+        inserted_pks = set(model.objects.filter(pk__in=pks).values_list('pk', flat=True)) - existing
+        inserted = [obj for obj in objects if obj.pk in inserted_pks]
+
+        if inserted and timestamp_fields:
+            for obj in inserted:
+                for name, value in zip(timestamp_fields, exported[obj.pk]):
+                    setattr(obj, name, value)
+            # bulk_update does not run pre_save, so the exported values stick
+            model.objects.bulk_update(inserted, timestamp_fields)
+        return len(inserted)
+
+    @staticmethod
+    def _timestamp_fields(model):
+        """Fields bulk_create would overwrite with the current time"""
+        return [
+            field.attname for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+
+    @staticmethod
+    def _fields(model):
+        """Concrete columns except the owner, using attnames for foreign keys"""
+        return [
+            field.attname for field in model._meta.concrete_fields
+            if field.name != 'user'
+        ]
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from core.telemetry import TaskTelemetry
+
+class Command(BaseCommand):
+    help = 'Show Celery task runtime, queue wait, query and write histograms'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort',
+            choices=['runtime', 'queries', 'rows', 'runs'],
+            default='runtime',
+            help='Order tasks by total runtime, queries, rows written or run count',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Clear all recorded telemetry',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            TaskTelemetry.reset()
+            self.stdout.write(self.style.SUCCESS('✅ Task telemetry cleared'))
+            return
+
+        snapshot = TaskTelemetry.snapshot()
+        if not snapshot:
+            self.stdout.write('No task telemetry recorded yet')
+            return
+
+        sort_metric = {'runtime': 'runtime_ms', 'queries': 'queries', 'rows': 'rows_written'}.get(options['sort'])
+
+        def sort_key(item):
+            _, data = item
+            if sort_metric is None:
+                return data['runs']
+            return data['metrics'].get(sort_metric, {}).get('sum', 0)
+
+        self.stdout.write(
+            f"{'task':<55} {'runs':>6} {'fail':>5} {'ms p50':>8} {'ms p95':>8} {'ms total':>10} "
+            f"{'wait p95':>9} {'queries':>8} {'rows':>8}"
+        )
+        for task_name, data in sorted(snapshot.items(), key=sort_key, reverse=True):
+            metrics = data['metrics']
+            runtime = metrics.get('runtime_ms', {})
+            wait = metrics.get('queue_wait_ms', {})
+            self.stdout.write(
+                f"{task_name:<55} {data['runs']:>6} {data['failures']:>5} "
+                f"{_fmt(runtime.get('p50')):>8} {_fmt(runtime.get('p95')):>8} {runtime.get('sum', 0):>10} "
+                f"{_fmt(wait.get('p95')):>9} {metrics.get('queries', {}).get('mean', 0):>8} "
+                f"{metrics.get('rows_written', {}).get('mean', 0):>8}"
+            )
+
+
+def _fmt(value):
+    return '-' if value is None else value
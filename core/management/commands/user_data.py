@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from core.data_export import UserDataExport
+
+class Command(BaseCommand):
+    help = "Export a user's data to a compressed NDJSON file, or restore it from one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', type=str, help='User whose data is exported or restored')
+        parser.add_argument(
+            '--restore',
+            type=str,
+            metavar='PATH',
+            help='Restore from this .ndjson.gz export instead of exporting',
+        )
+        parser.add_argument(
+            '--output-dir',
+            type=str,
+            help='Directory for the export file (defaults to USER_EXPORT_DIR)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            self.stdout.write(self.style.ERROR(f'User "{options["username"]}" not found!'))
+            return
+
+        exporter = UserDataExport(user, export_dir=options.get('output_dir'))
+
+        if options.get('restore'):
+            counts = exporter.restore(options['restore'])
+            for label, count in counts.items():
+                self.stdout.write(f'  {label}: {count} restored')
+            self.stdout.write(self.style.SUCCESS(f'✅ Restored {sum(counts.values())} rows for {user.username}'))
+            return
+
+        path, counts = exporter.export()
+        for label, count in counts.items():
+            self.stdout.write(f'  {label}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Exported {sum(counts.values())} rows to {path}'))
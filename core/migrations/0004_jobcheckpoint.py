@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_activityresource_icon_resourcecategory_color_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('cursor', models.CharField(blank=True, max_length=100)),
+                ('state', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'job_checkpoints',
+            },
+        ),
+    ]
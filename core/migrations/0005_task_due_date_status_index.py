@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_jobcheckpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['due_date', 'status'], name='tasks_due_dat_6498c2_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:08
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_task_due_date_status_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Habit',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(blank=True, choices=[('morning_routine', '🌅 Morning Routine'), ('fitness', '💪 Fitness'), ('meal', '🍽️ Meal'), ('academic', '📚 Academic'), ('personal', '🚀 Personal Development'), ('social', '❤️ Social'), ('reflection', '📊 Reflection'), ('rest', '😴 Rest')], max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('history_start', models.DateField(blank=True, null=True)),
+                ('completion_bitmap', models.BinaryField(blank=True, default=bytes)),
+                ('total_completions', models.IntegerField(default=0)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('longest_streak', models.IntegerField(default=0)),
+                ('last_completed_on', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='habits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'habits',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['is_active', 'last_completed_on'], name='habits_is_acti_631629_idx')],
+            },
+        ),
+    ]
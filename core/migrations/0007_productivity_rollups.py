@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:10
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_habit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progresstracker',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='ProductivityRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('days_tracked', models.IntegerField(default=0)),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('study_hours', models.FloatField(default=0.0)),
+                ('avg_productivity', models.FloatField(default=0.0)),
+                ('avg_consistency', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='productivity_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'productivity_rollups',
+                'ordering': ['-period_start'],
+                'unique_together': {('user', 'period', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:11
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_productivity_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmartSuggestion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('suggestion_type', models.CharField(choices=[('productivity_tip', 'Productivity Tip'), ('study_recommendation', 'Study Recommendation'), ('time_optimization', 'Time Optimization')], max_length=30)),
+                ('period', models.DateField()),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('confidence_score', models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)])),
+                ('is_dismissed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'smart_suggestions',
+                'ordering': ['-period', '-confidence_score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['updated_at'], name='tasks_updated_57f1b1_idx'),
+        ),
+        migrations.AddField(
+            model_name='smartsuggestion',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='smart_suggestions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='smartsuggestion',
+            unique_together={('user', 'suggestion_type', 'period')},
+        ),
+    ]
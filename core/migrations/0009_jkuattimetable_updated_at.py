@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_smartsuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jkuattimetable',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:16
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_completed_at(apps, schema_editor):
+    Task = apps.get_model('core', 'Task')
+    Task.objects.filter(status='completed', completed_at__isnull=True).update(completed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_jkuattimetable_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progresstracker',
+            name='activities_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='progresstracker',
+            name='activities_planned',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ActivityCheckIn',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkins', to='core.smartactivity')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_checkins', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'activity_checkins',
+                'ordering': ['-date'],
+                'unique_together': {('activity', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
@@ -262,6 +262,7 @@ class JKUATTimetable(models.Model):
     venue = models.CharField(max_length=100)
     activity_type = models.CharField(max_length=20, choices=Schedule.ACTIVITY_TYPES, default='lecture')
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['day', 'start_time']
@@ -304,12 +305,17 @@ class Task(models.Model):
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='todo')
     due_date = models.DateField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'tasks'
         ordering = ['priority', 'due_date']
+        indexes = [
+            models.Index(fields=['due_date', 'status']),
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         return self.title
@@ -319,10 +325,13 @@ class ProgressTracker(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress_entries')
     date = models.DateField(default=timezone.now)
     tasks_completed = models.IntegerField(default=0)
+    activities_completed = models.IntegerField(default=0)
+    activities_planned = models.IntegerField(default=0)
     study_hours = models.FloatField(default=0.0, validators=[MinValueValidator(0.0)])
     productivity_score = models.FloatField(default=0.0, validators=[MinValueValidator(0.0), MaxValueValidator(100.0)])
     consistency_score = models.FloatField(default=0.0, validators=[MinValueValidator(0.0), MaxValueValidator(100.0)])
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         db_table = 'progress_tracker'
@@ -332,6 +341,219 @@ class ProgressTracker(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.date}"
 
+class ActivityCheckIn(models.Model):
+    """A smart activity checked off as done on a given day"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_checkins')
+    activity = models.ForeignKey(SmartActivity, on_delete=models.CASCADE, related_name='checkins')
+    date = models.DateField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'activity_checkins'
+        unique_together = ['activity', 'date']
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.activity.title} on {self.date}"
+
+class ProductivityRollup(models.Model):
+    """Per-user daily and weekly aggregates of ProgressTracker, rebuilt by core.analytics"""
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='productivity_rollups')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    days_tracked = models.IntegerField(default=0)
+    tasks_completed = models.IntegerField(default=0)
+    study_hours = models.FloatField(default=0.0)
+    avg_productivity = models.FloatField(default=0.0)
+    avg_consistency = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'productivity_rollups'
+        unique_together = ['user', 'period', 'period_start']
+        ordering = ['-period_start']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.period} of {self.period_start}"
+
+class SmartSuggestion(models.Model):
+    """Generated suggestion, at most one per user, type and day"""
+    SUGGESTION_TYPES = [
+        ('productivity_tip', 'Productivity Tip'),
+        ('study_recommendation', 'Study Recommendation'),
+        ('time_optimization', 'Time Optimization'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='smart_suggestions')
+    suggestion_type = models.CharField(max_length=30, choices=SUGGESTION_TYPES)
+    period = models.DateField()
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    confidence_score = models.FloatField(default=0.0, validators=[MinValueValidator(0.0), MaxValueValidator(1.0)])
+    is_dismissed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'smart_suggestions'
+        unique_together = ['user', 'suggestion_type', 'period']
+        ordering = ['-period', '-confidence_score']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.title}"
+
+class Habit(models.Model):
+    """Daily habit whose completion history is stored as a compact day bitmap.
+
+    Bit i of completion_bitmap is set when the habit was done on
+    history_start + i days (one byte covers eight days). Streak counters are
+    maintained on every change, so streaks and "done today" are O(1) reads.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='habits')
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    category = models.CharField(max_length=20, choices=SmartActivity.CATEGORY_CHOICES, blank=True)
+    is_active = models.BooleanField(default=True)
+    
+    # Completion history
+    history_start = models.DateField(null=True, blank=True)
+    completion_bitmap = models.BinaryField(default=bytes, blank=True)
+    total_completions = models.IntegerField(default=0)
+    
+    # Denormalized streak state
+    current_streak = models.IntegerField(default=0)
+    longest_streak = models.IntegerField(default=0)
+    last_completed_on = models.DateField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'habits'
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['is_active', 'last_completed_on']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.name}"
+    
+    @staticmethod
+    def streak_as_of(current_streak, last_completed_on, day):
+        """Streak still alive on `day`: it ends once a full day passes without completion"""
+        if last_completed_on and last_completed_on >= day - timedelta(days=1):
+            return current_streak
+        return 0
+    
+    def streak_on(self, day=None):
+        return self.streak_as_of(self.current_streak, self.last_completed_on, day or timezone.localdate())
+    
+    @property
+    def done_today(self):
+        return self.last_completed_on == timezone.localdate()
+    
+    def is_completed_on(self, day):
+        if not self.history_start or day < self.history_start:
+            return False
+        return bool(self._bits() >> (day - self.history_start).days & 1)
+    
+    def completed_days(self, start, end):
+        """Dates between start and end (inclusive) on which the habit was done"""
+        days = []
+        day = start
+        while day <= end:
+            if self.is_completed_on(day):
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+    
+    # Columns mark_completed/unmark_completed write; other fields are never overwritten by a toggle
+    HISTORY_FIELDS = [
+        'history_start', 'completion_bitmap', 'total_completions',
+        'current_streak', 'longest_streak', 'last_completed_on', 'updated_at',
+    ]
+    
+    def mark_completed(self, day=None):
+        """Record a completion, extending the streak without rescanning history.
+
+        The bitmap is changed in memory, so concurrent callers must hold the
+        row with select_for_update() (see core.views.habit_toggle).
+        """
+        day = day or timezone.localdate()
+        if self.is_completed_on(day):
+            return False
+        
+        self._set_bit(day, True)
+        self.total_completions += 1
+        
+        if self.last_completed_on is None or day > self.last_completed_on:
+            if self.last_completed_on == day - timedelta(days=1):
+                self.current_streak += 1
+            else:
+                self.current_streak = 1
+            self.last_completed_on = day
+            self.longest_streak = max(self.longest_streak, self.current_streak)
+        else:
+            # Back-filled a past day, which may join two runs together
+            self._recompute_streaks()
+        
+        self.save(update_fields=self.HISTORY_FIELDS)
+        return True
+    
+    def unmark_completed(self, day=None):
+        day = day or timezone.localdate()
+        if not self.is_completed_on(day):
+            return False
+        
+        self._set_bit(day, False)
+        self.total_completions -= 1
+        self._recompute_streaks()
+        self.save(update_fields=self.HISTORY_FIELDS)
+        return True
+    
+    def _bits(self):
+        return int.from_bytes(bytes(self.completion_bitmap or b''), 'little')
+    
+    def _set_bit(self, day, value):
+        bits = self._bits()
+        if self.history_start is None:
+            self.history_start = day
+        elif day < self.history_start:
+            # Move the origin back so the new day gets a non-negative offset
+            bits <<= (self.history_start - day).days
+            self.history_start = day
+        
+        offset = (day - self.history_start).days
+        if value:
+            bits |= 1 << offset
+        else:
+            bits &= ~(1 << offset)
+        self.completion_bitmap = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    
+    def _recompute_streaks(self):
+        """Full rescan of the bitmap, only needed when history is edited out of order"""
+        bits = self._bits()
+        longest = run = 0
+        for offset in range(bits.bit_length()):
+            run = run + 1 if bits >> offset & 1 else 0
+            longest = max(longest, run)
+        
+        # The highest set bit is the latest completion, so the final run is the current streak
+        last_offset = bits.bit_length() - 1
+        
+        self.current_streak = run
+        self.longest_streak = longest
+        self.last_completed_on = self.history_start + timedelta(days=last_offset) if bits else None
+
 class ResourceCategory(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
@@ -1099,4 +1321,83 @@ class DailyFocus(models.Model):
         verbose_name_plural = 'Daily Focus Quotes'
     
     def __str__(self):
-        return f"{self.category} - {self.quote[:50]}..."
\ No newline at end of file
+        return f"{self.category} - {self.quote[:50]}..."
+class JobCheckpoint(models.Model):
+    """Resumable progress/watermark for long-running periodic jobs"""
+    name = models.CharField(max_length=100, unique=True)
+    watermark = models.DateTimeField(null=True, blank=True)
+    cursor = models.CharField(max_length=100, blank=True)
+    state = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'job_checkpoints'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.watermark}"
+
+
+class ChatRoom(models.Model):
+    """Chat room shared by a set of participants"""
+    ROOM_TYPES = [
+        ('direct', 'Direct Message'),
+        ('group', 'Group'),
+        ('study', 'Study Group'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    room_type = models.CharField(max_length=20, choices=ROOM_TYPES, default='group')
+    participants = models.ManyToManyField(User, related_name='chat_rooms')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_chat_rooms')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'chat_rooms'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+class ChatMessage(models.Model):
+    """Message in a chat room; history is read newest first by (created_at, id)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='messages')
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_messages')
+    content = models.TextField()
+    is_edited = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'chat_messages'
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Serves both the latest page and keyset pages further back
+            models.Index(fields=['room', 'created_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.sender.username}: {self.content[:50]}"
+
+class ChatReadState(models.Model):
+    """How far a user has read in a room: everything up to (last_read_at, last_read_message) is read.
+
+    One row per user per room replaces per-message read receipts; it only ever
+    moves forward (see core.chat.ChatReads).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_read_states')
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='read_states')
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    last_read_message = models.ForeignKey(ChatMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'chat_read_states'
+        unique_together = ['user', 'room']
+    
+    def __str__(self):
+        return f"{self.user.username} read {self.room.name} to {self.last_read_at}"
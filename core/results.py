@@ -0,0 +1,49 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django_celery_results.models import GroupResult, TaskResult
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskResultPruner:
+    """Bounded purge of expired rows from django_celery_results.
+
+    Most tasks no longer store results (CELERY_TASK_IGNORE_RESULT), so what is
+    left are results of tasks that opted in and failures. Rows older than
+    CELERY_RESULT_EXPIRES are removed oldest first in primary-key chunks, each
+    in its own short transaction, so the purge never holds a long lock on the
+    result tables while workers are writing to them.
+    """
+
+    MODELS = [TaskResult, GroupResult]
+
+    def __init__(self, expires=None, chunk_size=1000):
+        self.expires = expires or getattr(settings, 'CELERY_RESULT_EXPIRES', None) or timedelta(days=1)
+        if not isinstance(self.expires, timedelta):
+            self.expires = timedelta(seconds=self.expires)
+        self.chunk_size = chunk_size
+
+    def run(self, now=None):
+        """Delete results finished before the expiry window, returning rows deleted per model"""
+        cutoff = (now or timezone.now()) - self.expires
+        deleted = {model._meta.model_name: self._delete_in_chunks(model, cutoff) for model in self.MODELS}
+        logger.info(f"Pruned task results older than {cutoff:%Y-%m-%d %H:%M}: {deleted}")
+        return deleted
+
+    def _delete_in_chunks(self, model, cutoff):
+        deleted = 0
+        while True:
+            ids = list(
+                model.objects.filter(date_done__lt=cutoff)
+                .order_by('date_done', 'id')
+                .values_list('id', flat=True)[:self.chunk_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                count, _ = model.objects.filter(id__in=ids).delete()
+            deleted += count
+        return deleted
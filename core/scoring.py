@@ -0,0 +1,109 @@
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+import logging
+
+from .analytics import LiveAnalytics
+from .models import ProgressTracker, SmartActivity
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressScorer:
+    """Keeps today's ProgressTracker row current as things get done.
+
+    Each event (a task completed or reopened, an activity checked in or
+    undone) is applied as one atomic UPDATE: the counters move with F()
+    expressions and the derived scores are recomputed from the new counters
+    in the same statement, so concurrent events never lose an increment and
+    readers always see finished numbers.
+    """
+
+    # Productivity points per unit, capped at 100
+    TASK_POINTS = 10.0
+    STUDY_HOUR_POINTS = 10.0
+    ACTIVITY_POINTS = 5.0
+
+    # Categories whose check-ins count towards study hours
+    STUDY_CATEGORIES = ['academic']
+
+    @classmethod
+    def task_completed(cls, user_id, day=None):
+        cls.apply(user_id, day, tasks=1)
+
+    @classmethod
+    def task_reopened(cls, user_id, day=None):
+        cls.apply(user_id, day, tasks=-1, create=False)
+
+    @classmethod
+    def activity_checked_in(cls, activity, day=None):
+        cls.apply(activity.user_id, day, activities=1, study_hours=cls._study_hours(activity))
+
+    @classmethod
+    def activity_unchecked(cls, activity, day=None):
+        cls.apply(activity.user_id, day, activities=-1, study_hours=-cls._study_hours(activity), create=False)
+
+    @classmethod
+    def apply(cls, user_id, day=None, tasks=0, activities=0, study_hours=0.0, create=True):
+        """Move the day's counters and rescore, creating the tracker row on first use.
+
+        Undo events pass create=False: with no row there is nothing to take back,
+        and a cascade delete of the user must not recreate one.
+        """
+        day = day or timezone.localdate()
+        values = cls._update_values(tasks, activities, study_hours)
+
+        updated = ProgressTracker.objects.filter(user_id=user_id, date=day).update(**values)
+        if not updated and create:
+            ProgressTracker.objects.get_or_create(
+                user_id=user_id,
+                date=day,
+                defaults={'activities_planned': cls.planned_activities(user_id, day)}
+            )
+            updated = ProgressTracker.objects.filter(user_id=user_id, date=day).update(**values)
+        
+        if updated:
+            LiveAnalytics.changed(user_id)
+
+    @staticmethod
+    def planned_activities(user_id, day):
+        """Active smart activities scheduled for the day, 'daily' ones included"""
+        return SmartActivity.objects.filter(
+            Q(day=day.strftime('%A')) | Q(day='daily'),
+            user_id=user_id,
+            is_active=True
+        ).count()
+
+    @classmethod
+    def _update_values(cls, tasks, activities, study_hours):
+        tasks_completed = Greatest(F('tasks_completed') + tasks, 0)
+        activities_completed = Greatest(F('activities_completed') + activities, 0)
+        hours = Greatest(F('study_hours') + study_hours, 0.0, output_field=FloatField())
+
+        productivity = (
+            tasks_completed * cls.TASK_POINTS
+            + hours * cls.STUDY_HOUR_POINTS
+            + activities_completed * cls.ACTIVITY_POINTS
+        )
+        consistency = Case(
+            When(activities_planned__gt=0, then=Least(
+                activities_completed * 100.0 / F('activities_planned'), 100.0, output_field=FloatField()
+            )),
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+
+        return {
+            'tasks_completed': tasks_completed,
+            'activities_completed': activities_completed,
+            'study_hours': hours,
+            'productivity_score': Least(productivity, 100.0, output_field=FloatField()),
+            'consistency_score': consistency,
+            'updated_at': timezone.now(),
+        }
+
+    @staticmethod
+    def _study_hours(activity):
+        if activity.category not in ProgressScorer.STUDY_CATEGORIES:
+            return 0.0
+        return (activity.duration_minutes or 0) / 60
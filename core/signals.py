@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from core.models import UserTimetable, JKUATTimetable, SmartActivity
+from django.utils import timezone
+from core.models import UserTimetable, JKUATTimetable, SmartActivity, Task, ActivityCheckIn, ChatRoom, UserProfile
+from core.analytics import LiveAnalytics
+from core.chat import ChatRooms
 from core.smart_scheduler import SmartScheduler
+from core.scoring import ProgressScorer
 
 @receiver(post_save, sender=UserTimetable)
 def adjust_schedule_on_timetable_save(sender, instance, created, **kwargs):
@@ -27,4 +31,84 @@ def adjust_schedule_on_jkuat_save(sender, instance, created, **kwargs):
 def adjust_schedule_on_jkuat_delete(sender, instance, **kwargs):
     """Auto-adjust smart activities when JKUAT timetable is deleted"""
     scheduler = SmartScheduler(instance.user)
-    scheduler.adjust_schedule_for_timetable(instance.day)
\ No newline at end of file
+    scheduler.adjust_schedule_for_timetable(instance.day)
+
+@receiver(pre_save, sender=Task)
+def track_task_completion(sender, instance, **kwargs):
+    """Stamp completed_at and remember the status transition for scoring"""
+    previous = None
+    if not instance._state.adding:
+        previous = Task.objects.filter(pk=instance.pk).values('status', 'completed_at').first()
+    
+    was_completed = bool(previous) and previous['status'] == 'completed'
+    is_completed = instance.status == 'completed'
+    
+    if is_completed and not was_completed:
+        instance.completed_at = instance.completed_at or timezone.now()
+    elif was_completed and not is_completed:
+        instance._reopened_from = previous['completed_at']
+        instance.completed_at = None
+    
+    instance._completion_changed = is_completed != was_completed
+
+@receiver(post_save, sender=Task)
+def score_task_completion(sender, instance, **kwargs):
+    """Move today's progress when a task is completed or reopened"""
+    if not getattr(instance, '_completion_changed', False):
+        return
+    instance._completion_changed = False
+    
+    if instance.status == 'completed':
+        ProgressScorer.task_completed(instance.user_id, timezone.localdate(instance.completed_at))
+    else:
+        reopened_from = instance.__dict__.pop('_reopened_from', None)
+        ProgressScorer.task_reopened(instance.user_id, timezone.localdate(reopened_from) if reopened_from else None)
+
+@receiver(post_save, sender=ActivityCheckIn)
+def score_activity_check_in(sender, instance, created, **kwargs):
+    """Count a checked-off activity towards the day's progress"""
+    if created:
+        ProgressScorer.activity_checked_in(instance.activity, instance.date)
+
+@receiver(post_delete, sender=ActivityCheckIn)
+def score_activity_uncheck(sender, instance, **kwargs):
+    """Take an undone check-in back out of the day's progress"""
+    ProgressScorer.activity_unchecked(instance.activity, instance.date)
+
+@receiver(pre_save, sender=UserProfile)
+def track_streak_change(sender, instance, update_fields=None, **kwargs):
+    """Remember whether the streak moved, so unrelated profile saves stay cheap"""
+    instance._streak_changed = False
+    if instance._state.adding or (update_fields is not None and 'streak_count' not in update_fields):
+        return
+    previous = UserProfile.objects.filter(pk=instance.pk).values_list('streak_count', flat=True).first()
+    instance._streak_changed = previous is not None and previous != instance.streak_count
+
+@receiver(post_save, sender=UserProfile)
+def refresh_analytics_on_profile_save(sender, instance, created, **kwargs):
+    """Push streak changes to open analytics sockets"""
+    if not getattr(instance, '_streak_changed', False):
+        return
+    instance._streak_changed = False
+    LiveAnalytics.changed(instance.user_id)
+
+@receiver(post_save, sender=ChatRoom)
+@receiver(post_delete, sender=ChatRoom)
+def invalidate_chat_room(sender, instance, **kwargs):
+    """Drop the cached room info when a room changes"""
+    ChatRooms.invalidate(instance.id)
+
+@receiver(m2m_changed, sender=ChatRoom.participants.through)
+def invalidate_chat_room_participants(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached participant lists when anyone joins or leaves a room"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        ChatRooms.invalidate(instance.id)
+    elif action == 'pre_clear':
+        # user.chat_rooms.clear(): pk_set is not given, so look the rooms up first
+        for room_id in instance.chat_rooms.values_list('id', flat=True):
+            ChatRooms.invalidate(room_id)
+    else:
+        for room_id in pk_set:
+            ChatRooms.invalidate(room_id)
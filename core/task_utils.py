@@ -0,0 +1,59 @@
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def single_instance(timeout=None, key=None):
+    """Skip a periodic task run while a previous run of it is still going.
+
+    The lock is a cache key taken with add(), which is atomic on Redis. It
+    expires after `timeout` seconds (by default the task's hard time limit from
+    CELERY_TASK_ANNOTATIONS) so a killed worker cannot hold it forever. If the
+    cache is unreachable the task runs unlocked rather than not at all.
+
+    Apply it below @shared_task:
+
+        @shared_task
+        @single_instance()
+        def my_periodic_task(): ...
+    """
+    def decorator(func):
+        task_name = f'{func.__module__}.{func.__name__}'
+        lock_key = f'task-lock:{key or task_name}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            token = uuid.uuid4().hex
+            lock_timeout = timeout or _time_limit(task_name)
+
+            try:
+                acquired = cache.add(lock_key, token, lock_timeout)
+            except Exception as e:
+                logger.warning(f"Task lock unavailable for {task_name}, running unlocked: {e}")
+                return func(*args, **kwargs)
+
+            if not acquired:
+                logger.info(f"Skipping {task_name}: previous run still in progress")
+                return None
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                try:
+                    # Only release our own lock; it may have expired and been retaken
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+                except Exception as e:
+                    logger.warning(f"Could not release task lock for {task_name}: {e}")
+
+        return wrapper
+    return decorator
+
+
+def _time_limit(task_name):
+    annotations = getattr(settings, 'CELERY_TASK_ANNOTATIONS', {}) or {}
+    return annotations.get(task_name, {}).get('time_limit') or getattr(settings, 'CELERY_TASK_TIME_LIMIT', 600)
@@ -0,0 +1,212 @@
+from bisect import bisect_left
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from celery.signals import before_task_publish, task_prerun, task_postrun, task_failure
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bucket bounds per metric; the last bucket catches everything above
+BUCKETS = {
+    'runtime_ms': [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000],
+    'queue_wait_ms': [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000],
+    'queries': [0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000],
+    'rows_written': [0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000],
+}
+
+WRITE_STATEMENTS = ('insert', 'update', 'delete')
+
+
+class QueryCollector:
+    """connection.execute_wrapper that counts queries and rows written"""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows_written = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        if sql.lstrip()[:6].lower() in WRITE_STATEMENTS:
+            self.rows_written += max(context['cursor'].rowcount, 0)
+        return result
+
+
+class TaskTelemetry:
+    """Per-task histograms of runtime, queue wait, queries and rows written.
+
+    Celery signals open a measurement when a task starts and close it when it
+    ends; the database side comes from an execute wrapper installed for the
+    duration of the task. Each finished run adds to bucket counters in the
+    shared cache with atomic increments, so every worker feeds the same
+    histograms and readers get percentiles without touching the database.
+    """
+
+    PREFIX = 'telemetry'
+    TASKS_KEY = 'telemetry:tasks'
+    TIMEOUT = 7 * 24 * 60 * 60  # 1 week
+
+    _active = {}
+
+    @classmethod
+    def enabled(cls):
+        return getattr(settings, 'CELERY_TELEMETRY_ENABLED', True)
+
+    @classmethod
+    def start(cls, task_id, task_name, published_at=None):
+        collector = QueryCollector()
+        stack = ExitStack()
+        stack.enter_context(connection.execute_wrapper(collector))
+        cls._active[task_id] = {
+            'name': task_name,
+            'started': time.time(),
+            'published_at': published_at,
+            'collector': collector,
+            'stack': stack,
+        }
+
+    @classmethod
+    def finish(cls, task_id, failed=False):
+        run = cls._active.pop(task_id, None)
+        if run is None:
+            return
+        run['stack'].close()
+
+        finished = time.time()
+        observations = {
+            'runtime_ms': (finished - run['started']) * 1000,
+            'queries': run['collector'].queries,
+            'rows_written': run['collector'].rows_written,
+        }
+        if run['published_at']:
+            observations['queue_wait_ms'] = max(run['started'] - run['published_at'], 0) * 1000
+
+        try:
+            cls.record(run['name'], observations, failed=failed)
+        except Exception as e:
+            # Telemetry must never fail the task it measures
+            logger.warning(f"Could not record telemetry for {run['name']}: {e}")
+
+    @classmethod
+    def record(cls, task_name, observations, failed=False):
+        cls._register(task_name)
+        cls._incr(cls._key(task_name, 'runs'))
+        if failed:
+            cls._incr(cls._key(task_name, 'failures'))
+
+        for metric, value in observations.items():
+            bucket = bisect_left(BUCKETS[metric], value)
+            cls._incr(cls._key(task_name, metric, bucket))
+            cls._incr(cls._key(task_name, metric, 'sum'), int(round(value)))
+
+    @classmethod
+    def snapshot(cls):
+        """Current histograms for every task seen, with count, mean and percentiles"""
+        tasks = cache.get(cls.TASKS_KEY) or []
+        keys = []
+        for task_name in tasks:
+            keys += [cls._key(task_name, 'runs'), cls._key(task_name, 'failures')]
+            for metric, bounds in BUCKETS.items():
+                keys.append(cls._key(task_name, metric, 'sum'))
+                keys += [cls._key(task_name, metric, bucket) for bucket in range(len(bounds) + 1)]
+        values = cache.get_many(keys)
+
+        result = {}
+        for task_name in sorted(tasks):
+            metrics = {}
+            for metric, bounds in BUCKETS.items():
+                counts = [values.get(cls._key(task_name, metric, bucket), 0) for bucket in range(len(bounds) + 1)]
+                total = sum(counts)
+                if not total:
+                    continue
+                value_sum = values.get(cls._key(task_name, metric, 'sum'), 0)
+                metrics[metric] = {
+                    'count': total,
+                    'sum': value_sum,
+                    'mean': round(value_sum / total, 2),
+                    'p50': _percentile(counts, bounds, 0.50),
+                    'p95': _percentile(counts, bounds, 0.95),
+                    'p99': _percentile(counts, bounds, 0.99),
+                    'buckets': {_bucket_label(bounds, bucket): count for bucket, count in enumerate(counts) if count},
+                }
+            result[task_name] = {
+                'runs': values.get(cls._key(task_name, 'runs'), 0),
+                'failures': values.get(cls._key(task_name, 'failures'), 0),
+                'metrics': metrics,
+            }
+        return result
+
+    @classmethod
+    def reset(cls):
+        tasks = cache.get(cls.TASKS_KEY) or []
+        keys = [cls.TASKS_KEY]
+        for task_name in tasks:
+            keys += [cls._key(task_name, 'runs'), cls._key(task_name, 'failures')]
+            for metric, bounds in BUCKETS.items():
+                keys.append(cls._key(task_name, metric, 'sum'))
+                keys += [cls._key(task_name, metric, bucket) for bucket in range(len(bounds) + 1)]
+        cache.delete_many(keys)
+
+    @classmethod
+    def _register(cls, task_name):
+        tasks = cache.get(cls.TASKS_KEY) or []
+        if task_name not in tasks:
+            cache.set(cls.TASKS_KEY, tasks + [task_name], cls.TIMEOUT)
+
+    @classmethod
+    def _incr(cls, key, delta=1):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # First observation for this key (or it expired)
+            if not cache.add(key, delta, cls.TIMEOUT):
+                cache.incr(key, delta)
+
+    @classmethod
+    def _key(cls, task_name, *parts):
+        return ':'.join([cls.PREFIX, task_name] + [str(part) for part in parts])
+
+
+def _percentile(counts, bounds, fraction):
+    """Upper bound of the bucket holding the given fraction of observations"""
+    target = sum(counts) * fraction
+    seen = 0
+    for bucket, count in enumerate(counts):
+        seen += count
+        if seen >= target:
+            return bounds[bucket] if bucket < len(bounds) else None
+    return None
+
+
+def _bucket_label(bounds, bucket):
+    return f'<={bounds[bucket]}' if bucket < len(bounds) else f'>{bounds[-1]}'
+
+
+@before_task_publish.connect
+def stamp_publish_time(headers=None, **kwargs):
+    if headers is not None:
+        headers['published_at'] = time.time()
+
+
+@task_prerun.connect
+def start_task_telemetry(task_id=None, task=None, **kwargs):
+    if task is None or not TaskTelemetry.enabled():
+        return
+    TaskTelemetry.start(task_id, task.name, getattr(task.request, 'published_at', None))
+
+
+@task_failure.connect
+def mark_task_failure(task_id=None, **kwargs):
+    run = TaskTelemetry._active.get(task_id)
+    if run is not None:
+        run['failed'] = True
+
+
+@task_postrun.connect
+def finish_task_telemetry(task_id=None, **kwargs):
+    run = TaskTelemetry._active.get(task_id)
+    if run is not None:
+        TaskTelemetry.finish(task_id, failed=run.get('failed', False))
@@ -1,3 +1,145 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from core.models import Habit
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class HabitCompletionTests(TestCase):
+    START = date(2026, 3, 1)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='habits', password='x')
+        self.habit = Habit.objects.create(user=self.user, name='Read')
+
+    def day(self, offset):
+        return self.START + timedelta(days=offset)
+
+    def complete(self, *offsets):
+        for offset in offsets:
+            self.habit.mark_completed(self.day(offset))
+        self.habit.refresh_from_db()
+
+    def assertStreaks(self, current, longest, last_offset):
+        self.assertEqual(self.habit.current_streak, current)
+        self.assertEqual(self.habit.longest_streak, longest)
+        self.assertEqual(self.habit.last_completed_on, self.day(last_offset))
+
+    def test_consecutive_days_extend_the_streak(self):
+        self.complete(0, 1, 2)
+        self.assertStreaks(current=3, longest=3, last_offset=2)
+        self.assertEqual(self.habit.total_completions, 3)
+
+    def test_gap_restarts_the_streak(self):
+        self.complete(0, 1, 2, 4)
+        self.assertStreaks(current=1, longest=3, last_offset=4)
+
+    def test_marking_twice_is_a_no_op(self):
+        self.complete(0)
+        self.assertFalse(self.habit.mark_completed(self.day(0)))
+        self.assertEqual(self.habit.total_completions, 1)
+
+    def test_back_filling_a_gap_joins_the_runs(self):
+        self.complete(0, 1, 3, 4)
+        self.assertStreaks(current=2, longest=2, last_offset=4)
+
+        self.complete(2)
+        self.assertStreaks(current=5, longest=5, last_offset=4)
+        self.assertEqual(self.habit.completed_days(self.day(0), self.day(4)), [self.day(i) for i in range(5)])
+
+    def test_back_filling_before_the_origin_shifts_the_bitmap(self):
+        self.complete(5, 6)
+        self.assertEqual(self.habit.history_start, self.day(5))
+
+        self.complete(2, 4)
+        self.assertEqual(self.habit.history_start, self.day(2))
+        self.assertEqual(self.habit.completed_days(self.day(0), self.day(7)), [self.day(2), self.day(4), self.day(5), self.day(6)])
+        self.assertStreaks(current=3, longest=3, last_offset=6)
+
+    def test_unmarking_recomputes_the_streaks(self):
+        self.complete(0, 1, 2, 3, 4)
+
+        self.habit.unmark_completed(self.day(2))
+        self.habit.refresh_from_db()
+        self.assertFalse(self.habit.is_completed_on(self.day(2)))
+        self.assertStreaks(current=2, longest=2, last_offset=4)
+        self.assertEqual(self.habit.total_completions, 4)
+
+        self.habit.unmark_completed(self.day(4))
+        self.habit.refresh_from_db()
+        self.assertStreaks(current=1, longest=2, last_offset=3)
+
+    def test_unmarking_everything_clears_the_streak(self):
+        self.complete(0)
+        self.habit.unmark_completed(self.day(0))
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.current_streak, 0)
+        self.assertIsNone(self.habit.last_completed_on)
+
+    def test_toggle_only_writes_history_fields(self):
+        stale = Habit.objects.get(pk=self.habit.pk)
+        Habit.objects.filter(pk=self.habit.pk).update(name='Read more', is_active=False)
+
+        stale.mark_completed(self.day(0))
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.name, 'Read more')
+        self.assertFalse(self.habit.is_active)
+        self.assertTrue(self.habit.is_completed_on(self.day(0)))
+
+    def test_streak_lapses_after_a_missed_day(self):
+        self.complete(0, 1)
+        self.assertEqual(self.habit.streak_on(self.day(2)), 2)
+        self.assertEqual(self.habit.streak_on(self.day(3)), 0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class HabitToggleViewTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='toggler', password='x')
+        self.habit = Habit.objects.create(user=self.user, name='Stretch')
+        self.client.force_login(self.user)
+        self.url = reverse('habit_toggle', args=[self.habit.id])
+
+    def toggle(self, **data):
+        return self.client.post(self.url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()
+
+    def test_toggles_today(self):
+        response = self.toggle()
+        self.assertTrue(response['completed'])
+        self.assertEqual(response['current_streak'], 1)
+
+        response = self.toggle()
+        self.assertFalse(response['completed'])
+        self.assertEqual(response['total_completions'], 0)
+
+    def test_back_fills_a_past_day(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.toggle()
+        response = self.toggle(date=yesterday.isoformat())
+        self.assertTrue(response['completed'])
+        self.assertEqual(response['current_streak'], 2)
+
+    def test_toggle_works_from_the_stored_bitmap(self):
+        # Another request completed yesterday after this page loaded; the toggle must keep it
+        yesterday = timezone.localdate() - timedelta(days=1)
+        Habit.objects.get(pk=self.habit.pk).mark_completed(yesterday)
+
+        response = self.toggle()
+        self.assertEqual(response['total_completions'], 2)
+        self.assertEqual(response['current_streak'], 2)
+
+    def test_rejects_future_and_malformed_dates(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.assertFalse(self.toggle(date=tomorrow.isoformat())['success'])
+        self.assertFalse(self.toggle(date='not-a-date')['success'])
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.total_completions, 0)
+
+    def test_other_users_habits_are_not_found(self):
+        other = User.objects.create_user(username='other', password='x')
+        self.client.force_login(other)
+        self.assertEqual(self.client.post(self.url).status_code, 404)
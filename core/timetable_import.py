@@ -0,0 +1,176 @@
+from collections import namedtuple
+import os
+import pandas as pd
+import zipfile
+
+from .models import Schedule, UserTimetable
+from .smart_scheduler import SmartScheduler
+
+# Activity types that carry a real unit code; anything else is stored as PERSONAL
+ACADEMIC_TYPES = ['lecture', 'lab', 'review']
+
+DAY_PREFIXES = {day[:3].lower(): day for day, _ in UserTimetable.DAY_CHOICES}
+
+ImportResult = namedtuple('ImportResult', ['created', 'duplicates', 'errors', 'days'])
+
+
+class TimetableImporter:
+    """Bulk import of a CSV or Excel timetable into UserTimetable.
+
+    The sheet is read with pandas and every row is validated and normalised in
+    one vectorised pass. Rows already in the user's timetable (by the
+    unique_together key) or repeated in the file are dropped, the rest are
+    written with a single bulk_create, and the smart scheduler then runs once
+    per affected day instead of once per row.
+    """
+
+    MAX_ROWS = 500
+    ALLOWED_EXTENSIONS = ['.csv', '.xlsx']  # legacy .xls would need xlrd
+
+    # Header spellings accepted for each column
+    COLUMN_ALIASES = {
+        'day': ['day', 'weekday'],
+        'start_time': ['start_time', 'start', 'from', 'time_from'],
+        'end_time': ['end_time', 'end', 'to', 'time_to'],
+        'unit_code': ['unit_code', 'code', 'course_code', 'unit'],
+        'unit_name': ['unit_name', 'name', 'course_name', 'title', 'activity', 'activity_name'],
+        'venue': ['venue', 'location', 'room'],
+        'activity_type': ['activity_type', 'type'],
+    }
+    REQUIRED_COLUMNS = ['day', 'start_time', 'end_time', 'unit_name']
+
+    def __init__(self, user):
+        self.user = user
+
+    def import_file(self, upload):
+        """Import an uploaded file, returning an ImportResult"""
+        frame = self.read(upload)
+        frame, errors = self.normalize(frame)
+
+        existing = set(
+            UserTimetable.objects.filter(user=self.user).values_list('day', 'start_time', 'unit_code')
+        )
+        keys = list(zip(frame['day'], frame['start_time'], frame['unit_code']))
+        is_new = [key not in existing for key in keys]
+        duplicates = len(keys) - sum(is_new)
+        frame = frame.loc[is_new]
+
+        entries = [
+            UserTimetable(user=self.user, **row)
+            for row in frame[list(self.COLUMN_ALIASES)].to_dict('records')
+        ]
+        UserTimetable.objects.bulk_create(entries, ignore_conflicts=True)
+
+        # ignore_conflicts drops rows a concurrent import inserted first, so count what actually landed
+        inserted_pks = set(
+            UserTimetable.objects.filter(pk__in=[entry.pk for entry in entries]).values_list('pk', flat=True)
+        )
+        inserted = [entry for entry in entries if entry.pk in inserted_pks]
+        duplicates += len(entries) - len(inserted)
+
+        # bulk_create skips the post_save replan, so replan each affected day once here
+        inserted_days = {entry.day for entry in inserted}
+        days = [day for day, _ in UserTimetable.DAY_CHOICES if day in inserted_days]
+        if days:
+            scheduler = SmartScheduler(self.user)
+            for day in days:
+                scheduler.adjust_schedule_for_timetable(day)
+
+        return ImportResult(created=len(inserted), duplicates=duplicates, errors=errors, days=days)
+
+    def read(self, upload):
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension not in self.ALLOWED_EXTENSIONS:
+            raise ValueError(f"Unsupported file type {extension or '(none)'}; upload a CSV or .xlsx file")
+
+        try:
+            if extension == '.csv':
+                frame = pd.read_csv(upload, dtype=str, keep_default_na=False, nrows=self.MAX_ROWS + 1)
+            else:
+                frame = pd.read_excel(upload, dtype=str, keep_default_na=False, nrows=self.MAX_ROWS + 1)
+        except (ValueError, zipfile.BadZipFile) as e:
+            # Empty, truncated or mislabelled files; report them like any other bad upload
+            raise ValueError(f"Could not read {upload.name}; check that it is a valid {extension[1:].upper()} file") from e
+
+        if len(frame) > self.MAX_ROWS:
+            raise ValueError(f"Timetables are limited to {self.MAX_ROWS} rows")
+        return frame
+
+    def normalize(self, frame):
+        """Validate and clean every row at once, returning (valid rows, [(row number, error)])"""
+        frame = self._rename_columns(frame)
+        missing = [column for column in self.REQUIRED_COLUMNS if column not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+        for column in self.COLUMN_ALIASES:
+            if column not in frame.columns:
+                frame[column] = ''
+            frame[column] = frame[column].fillna('').astype(str).str.strip()
+
+        frame['day'] = frame['day'].str[:3].str.lower().map(DAY_PREFIXES)
+        starts = _parse_times(frame['start_time'])
+        ends = _parse_times(frame['end_time'])
+
+        frame['activity_type'] = frame['activity_type'].str.lower().replace('', 'lecture')
+        frame['unit_code'] = frame['unit_code'].str.upper()
+        personal = ~frame['activity_type'].isin(ACADEMIC_TYPES)
+        frame.loc[personal, 'unit_code'] = 'PERSONAL'
+
+        valid_types = [choice for choice, _ in Schedule.ACTIVITY_TYPES]
+        checks = [
+            (frame['day'].isna(), 'unknown day (use Monday-Friday)'),
+            (starts.isna(), 'invalid start time'),
+            (ends.isna(), 'invalid end time'),
+            (frame['unit_name'] == '', 'missing unit or activity name'),
+            (~personal & (frame['unit_code'] == ''), 'missing unit code'),
+            (~frame['activity_type'].isin(valid_types), 'unknown activity type'),
+        ]
+
+        errors = {}
+        invalid = pd.Series(False, index=frame.index)
+        for mask, message in checks:
+            for index in frame.index[mask & ~invalid]:
+                errors[index] = message
+            invalid |= mask
+
+        backwards = ~invalid & (_minutes(ends) <= _minutes(starts))
+        for index in frame.index[backwards]:
+            errors[index] = 'end time must be after start time'
+        invalid |= backwards
+
+        frame = frame[~invalid].copy()
+        frame['start_time'] = starts[~invalid].dt.time
+        frame['end_time'] = ends[~invalid].dt.time
+        # Truncate to the column lengths first, so codes that only differ past 20 characters count as duplicates
+        frame['unit_code'] = frame['unit_code'].str[:20]
+        frame['unit_name'] = frame['unit_name'].str[:200]
+        frame['venue'] = frame['venue'].str[:100]
+        frame = frame.drop_duplicates(subset=['day', 'start_time', 'unit_code'])
+
+        # Row numbers as the user sees them in the sheet (header is row 1)
+        return frame, [(index + 2, message) for index, message in sorted(errors.items())]
+
+    def _rename_columns(self, frame):
+        lookup = {}
+        for column, aliases in self.COLUMN_ALIASES.items():
+            for alias in aliases:
+                lookup[alias] = column
+
+        renamed = {}
+        for header in frame.columns:
+            key = str(header).strip().lower().replace(' ', '_')
+            if key in lookup and lookup[key] not in renamed.values():
+                renamed[header] = lookup[key]
+        return frame[list(renamed)].rename(columns=renamed).copy()
+
+
+def _parse_times(values):
+    """Parse '8:00', '08:00:00', '8am', '2:30 PM'... into timestamps, NaT when unparseable"""
+    # pandas needs minutes to read 12-hour times, so '8am' becomes '8:00 AM'
+    values = values.str.upper().str.replace(r'^(\d{1,2})\s*(AM|PM)$', r'\1:00 \2', regex=True)
+    return pd.to_datetime(values, format='mixed', errors='coerce')
+
+
+def _minutes(timestamps):
+    return timestamps.dt.hour * 60 + timestamps.dt.minute
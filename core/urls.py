@@ -8,12 +8,15 @@ urlpatterns = [
     
     # Timetable management
     path('timetable/', views.timetable_input, name='timetable_input'),
+    path('activities/<uuid:activity_id>/check-in/', views.activity_check_in, name='activity_check_in'),
+    path('timetable/import/', views.timetable_import, name='timetable_import'),
     path('timetable/delete/<uuid:entry_id>/', views.delete_timetable_entry, name='delete_timetable_entry'),
     path('timetable/generate-schedule/', views.generate_schedule_from_timetable, name='generate_schedule_from_timetable'),
     path('timetable/clear/', views.clear_timetable, name='clear_timetable'),
     
     # Activities management
     path('activities/', views.manage_activities, name='manage_activities'),
+    path('habits/<uuid:habit_id>/toggle/', views.habit_toggle, name='habit_toggle'),
     
     # Resources pages
     path('activities/resources/', views.activities_resources, name='activities_resources'),
@@ -39,4 +42,7 @@ urlpatterns = [
 
     # Theme toggle
     path('toggle-dark-mode/', views.toggle_dark_mode, name='toggle_dark_mode'),
+
+    # Celery task telemetry (staff only)
+    path('metrics/tasks/', views.task_metrics, name='task_metrics'),
 ]
\ No newline at end of file
@@ -3,20 +3,28 @@ from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
 from django.db.models import Q
 from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from core.models import (
     Schedule, UserProfile, JKUATTimetable, ActivityResource, 
     ResourceCategory, UserResourcePreference, Task, ProgressTracker,
-    UserTimetable, SmartActivity, DailyFocus
+    UserTimetable, SmartActivity, DailyFocus, ActivityCheckIn, Habit
 )
 from core.smart_scheduler import SmartScheduler
+from core.timetable_import import TimetableImporter
+from core.telemetry import TaskTelemetry
 import pytz
 from datetime import datetime, time, timedelta
 import json
+import logging
 import os
 import requests
 
+logger = logging.getLogger(__name__)
+
 def get_weather_data(location="Juja, KE"):
     """
     Get weather data from OpenWeatherMap API or return fallback data
@@ -147,13 +155,11 @@ def dashboard(request):
     # Get daily focus quote
     daily_focus = DailyFocus.objects.filter(is_active=True).order_by('?').first()
     
-    # Calculate consistency score
-    completed_activities = SmartActivity.objects.filter(
-        user=request.user,
-        last_adjusted__date=selected_date
-    ).count()
-    total_smart_activities = smart_activities.count()
-    consistency_score = (completed_activities / total_smart_activities * 100) if total_smart_activities > 0 else 0
+    # Consistency is kept current by ProgressScorer as activities are checked in
+    consistency_score = today_progress.consistency_score if today_progress else 0
+    checked_in_ids = set(
+        ActivityCheckIn.objects.filter(user=request.user, date=selected_date).values_list('activity_id', flat=True)
+    )
     
     # Get last adjustment time
     last_adjusted_activity = SmartActivity.objects.filter(
@@ -208,6 +214,7 @@ def dashboard(request):
         'next_7_days': next_7_days,
         'daily_focus': daily_focus,
         'consistency_score': round(consistency_score, 1),
+        'checked_in_ids': checked_in_ids,
         'last_adjusted_activity': last_adjusted_activity,
         'weather': weather,  # ADD WEATHER DATA TO CONTEXT
     }
@@ -271,10 +278,7 @@ def timetable_input(request):
                 activity_type=activity_type
             )
         
-        # AUTO-ADJUST: Trigger smart scheduler immediately
-        scheduler = SmartScheduler(request.user)
-        scheduler.adjust_schedule_for_timetable(day)
-        
+        # AUTO-ADJUST: the UserTimetable post_save signal replans the day
         return redirect('timetable_input')
     
     # Get existing timetable entries grouped by day
@@ -296,12 +300,97 @@ def timetable_input(request):
 def delete_timetable_entry(request, entry_id):
     """Delete a timetable entry and auto-adjust schedule"""
     entry = get_object_or_404(UserTimetable, id=entry_id, user=request.user)
-    day = entry.day
+    # AUTO-ADJUST: the UserTimetable post_delete signal replans the day
     entry.delete()
     
-    # AUTO-ADJUST: Trigger smart scheduler after deletion
-    scheduler = SmartScheduler(request.user)
-    scheduler.adjust_schedule_for_timetable(day)
+    return redirect('timetable_input')
+
+@login_required
+def activity_check_in(request, activity_id):
+    """Toggle today's check-in for a smart activity; progress scores follow via signals"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request'})
+    
+    activity = get_object_or_404(SmartActivity, id=activity_id, user=request.user)
+    today = timezone.localdate()
+    
+    check_in = ActivityCheckIn.objects.filter(activity=activity, date=today).first()
+    if check_in:
+        check_in.delete()
+    else:
+        ActivityCheckIn.objects.get_or_create(user=request.user, activity=activity, date=today)
+    
+    if request.headers.get('x-requested-with') != 'XMLHttpRequest':
+        return redirect('dashboard')
+    
+    progress = ProgressTracker.objects.filter(user=request.user, date=today).values(
+        'tasks_completed', 'activities_completed', 'study_hours', 'productivity_score', 'consistency_score'
+    ).first()
+    return JsonResponse({'success': True, 'checked_in': check_in is None, 'progress': progress})
+
+@login_required
+def habit_toggle(request, habit_id):
+    """Toggle a habit's completion for today, or for a past day given as ?date=YYYY-MM-DD"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request'})
+    
+    today = timezone.localdate()
+    
+    day = today
+    if request.POST.get('date'):
+        try:
+            day = datetime.strptime(request.POST['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid date'})
+        if day > today:
+            return JsonResponse({'success': False, 'error': 'Cannot complete a habit in the future'})
+    
+    # Lock the row so a double tap or two back-fills cannot each write their own copy of the bitmap
+    with transaction.atomic():
+        habit = get_object_or_404(Habit.objects.select_for_update(), id=habit_id, user=request.user)
+        if habit.is_completed_on(day):
+            habit.unmark_completed(day)
+        else:
+            habit.mark_completed(day)
+    
+    if request.headers.get('x-requested-with') != 'XMLHttpRequest':
+        return redirect('dashboard')
+    
+    return JsonResponse({
+        'success': True,
+        'date': day.isoformat(),
+        'completed': habit.is_completed_on(day),
+        'current_streak': habit.streak_on(today),
+        'longest_streak': habit.longest_streak,
+        'total_completions': habit.total_completions,
+    })
+
+@login_required
+def timetable_import(request):
+    """Import a whole CSV/Excel timetable at once, replanning each affected day once"""
+    if request.method != 'POST' or 'timetable_file' not in request.FILES:
+        return redirect('timetable_input')
+    
+    try:
+        result = TimetableImporter(request.user).import_file(request.FILES['timetable_file'])
+    except ValueError as e:
+        # Validation problems with the file itself; the message is meant for the user
+        messages.error(request, f"Import failed: {e}")
+        return redirect('timetable_input')
+    except Exception:
+        logger.exception(f"Timetable import failed for {request.user.username}")
+        messages.error(request, "Import failed due to an unexpected error. Please try again later.")
+        return redirect('timetable_input')
+    
+    summary = f"Imported {result.created} entries"
+    if result.duplicates:
+        summary += f", skipped {result.duplicates} already in your timetable"
+    messages.success(request, summary)
+    
+    for row, error in result.errors[:10]:
+        messages.warning(request, f"Row {row}: {error}")
+    if len(result.errors) > 10:
+        messages.warning(request, f"...and {len(result.errors) - 10} more rows with errors")
     
     return redirect('timetable_input')
 
@@ -920,4 +1009,9 @@ def toggle_dark_mode(request):
                 'message': str(e)
             }, status=500)
     
-    return JsonResponse({'status': 'error', 'message': 'Method not allowed'}, status=405)
\ No newline at end of file
+    return JsonResponse({'status': 'error', 'message': 'Method not allowed'}, status=405)
+
+@staff_member_required
+def task_metrics(request):
+    """Celery task runtime, queue wait, query and write histograms"""
+    return JsonResponse({'tasks': TaskTelemetry.snapshot()})
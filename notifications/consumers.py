@@ -1,12 +1,32 @@
 import json
 import asyncio
+import uuid
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.utils import timezone
 from asgiref.sync import sync_to_async
-from core.models import ChatRoom, ChatMessage
+from core.models import ChatMessage
+from core.analytics import LiveAnalytics
+from core.chat import ChatHistory, ChatReads, ChatRooms, RoomPresence
 
 class NotificationConsumer(AsyncWebsocketConsumer):
+    """Per-user notification stream.
+    
+    Notifications arriving from the group are buffered for a short window and
+    sent as one frame carrying the whole list and the unread count, so a burst
+    costs the client one frame and the server one count query instead of two
+    frames and a query per notification. The window is set per connection with
+    ?coalesce_ms=N on the URL or a {"type": "configure", "coalesce_ms": N}
+    message; 0 sends every notification as soon as it arrives.
+    """
+    
+    COALESCE_MS = getattr(settings, 'NOTIFICATION_WS_COALESCE_MS', 200)
+    MAX_COALESCE_MS = 5000
+    MAX_BUFFERED = 100  # flush early rather than hold an unbounded list
+    
     async def connect(self):
         self.user = self.scope["user"]
         
@@ -15,6 +35,10 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             return
         
         self.room_group_name = f'notifications_{self.user.id}'
+        self.pending = []
+        self.flush_task = None
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        self.coalesce_ms = self.clamp_coalesce_ms(query.get('coalesce_ms', [self.COALESCE_MS])[0])
         
         # Join notification group
         await self.channel_layer.group_add(
@@ -32,11 +56,15 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         }))
 
     async def disconnect(self, close_code):
+        if getattr(self, 'flush_task', None) is not None:
+            self.flush_task.cancel()
+        
         # Leave notification group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        if hasattr(self, 'room_group_name'):
+            await self.channel_layer.group_discard(
+                self.room_group_name,
+                self.channel_name
+            )
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
@@ -52,51 +80,108 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 'type': 'unread_count',
                 'unread_count': unread_count
             }))
+        
+        elif message_type == 'configure':
+            self.coalesce_ms = self.clamp_coalesce_ms(text_data_json.get('coalesce_ms', self.coalesce_ms))
+            if not self.coalesce_ms:
+                await self.flush_notifications()
 
     async def notification_message(self, event):
         """Receive notification from group"""
-        notification = event['notification']
+        await self.queue_notifications([event['notification']])
+
+    async def notification_batch(self, event):
+        """Receive several notifications created at once for this user"""
+        await self.queue_notifications(event['notifications'])
+
+    async def queue_notifications(self, notifications):
+        self.pending.extend(notifications)
         
-        # Send notification to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'new_notification',
-            'notification': notification
-        }))
+        if not self.coalesce_ms or len(self.pending) >= self.MAX_BUFFERED:
+            await self.flush_notifications()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_after(self.coalesce_ms / 1000))
+
+    async def flush_after(self, delay):
+        await asyncio.sleep(delay)
+        self.flush_task = None
+        await self.flush_notifications()
+
+    async def flush_notifications(self):
+        """Send everything buffered as one frame with the current unread count"""
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        
+        notifications, self.pending = self.pending, []
+        if not notifications:
+            return
         
-        # Send updated count
         unread_count = await self.get_unread_count()
         await self.send(text_data=json.dumps({
-            'type': 'unread_count',
+            'type': 'new_notifications',
+            'notifications': notifications,
+            'count': len(notifications),
             'unread_count': unread_count
         }))
 
+    def clamp_coalesce_ms(self, value):
+        try:
+            return min(max(int(value), 0), self.MAX_COALESCE_MS)
+        except (TypeError, ValueError):
+            return self.COALESCE_MS
+
     @database_sync_to_async
     def get_unread_count(self):
-        from .models import Notification
-        return Notification.objects.filter(user=self.user, is_read=False).count()
+        from .counters import UnreadCounter
+        return UnreadCounter.get(self.user.id)
 
     @database_sync_to_async
     def mark_notification_read(self, notification_id):
-        from .models import Notification
+        from django.core.exceptions import ValidationError
+        from .counters import UnreadCounter
         try:
-            notification = Notification.objects.get(id=notification_id, user=self.user)
-            notification.is_read = True
-            notification.save()
-        except Notification.DoesNotExist:
+            UnreadCounter.mark_read(self.user.id, [notification_id])
+        except ValidationError:
+            # Malformed notification id
             pass
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    # mark_read messages arriving within this window are applied as one watermark update
+    READ_COALESCE_MS = getattr(settings, 'CHAT_READ_COALESCE_MS', 1000)
+    # At most one typing relay per user per room in this window; the latest state follows when it closes
+    TYPING_THROTTLE_MS = getattr(settings, 'CHAT_TYPING_THROTTLE_MS', 3000)
+    # Joins and leaves within this window go out as one presence snapshot
+    PRESENCE_INTERVAL_MS = getattr(settings, 'CHAT_PRESENCE_INTERVAL_MS', 2000)
+    
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
-        self.room_group_name = f'chat_{self.room_id}'
         self.user = self.scope["user"]
+        self.pending_reads = set()
+        self.read_task = None
+        self.heartbeat_task = None
+        self.present = False
+        self.typing_state = False
+        self.typing_sent = False
+        self.typing_pending = False
+        self.typing_task = None
 
         if self.user.is_anonymous:
             await self.close()
             return
 
-        # Check if user is a participant of the room
-        if not await self.is_room_participant():
+        try:
+            self.room_id = str(uuid.UUID(self.room_id))
+        except ValueError:
+            # Not a room id at all; refuse before it reaches the database
+            await self.close(code=4400)
+            return
+
+        self.room_group_name = f'chat_{self.room_id}'
+
+        # Room info and membership come from one cached lookup
+        room_info = await self.get_room_info()
+        if not room_info or not room_info['is_active'] or self.user.id not in room_info['participant_ids']:
             await self.close()
             return
 
@@ -108,48 +193,49 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
-        # Send room info and recent messages
-        room_info = await self.get_room_info()
+        # Send room info and the latest page of messages
+        room_info = {key: value for key, value in room_info.items() if key not in ('participant_ids', 'participant_names')}
+        room_info['unread_count'] = await self.get_unread_count()
         await self.send(text_data=json.dumps({
             'type': 'room_info',
             'room': room_info
         }))
 
-        # Send last 50 messages
-        recent_messages = await self.get_recent_messages()
-        await self.send(text_data=json.dumps({
-            'type': 'message_history',
-            'messages': recent_messages
-        }))
+        await self.send_history()
 
-        # Notify others that user joined
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'user_joined',
-                'user_id': self.user.id,
-                'username': self.user.username
-            }
-        )
+        # The newcomer gets the current snapshot now; everyone else gets it with the next broadcast
+        await self.update_presence(join=True)
+        self.present = True
+        await self.send(text_data=json.dumps(await self.presence_snapshot()))
+        await self.schedule_presence_broadcast()
+        self.heartbeat_task = asyncio.ensure_future(self.presence_heartbeat())
 
     async def disconnect(self, close_code):
+        for task_name in ('heartbeat_task', 'typing_task'):
+            if getattr(self, task_name, None) is not None:
+                getattr(self, task_name).cancel()
+                setattr(self, task_name, None)
+
+        # Apply reads still waiting for the coalescing window
+        if getattr(self, 'read_task', None) is not None:
+            self.read_task.cancel()
+            self.read_task = None
+        if getattr(self, 'pending_reads', None):
+            await self.mark_messages_read(list(self.pending_reads))
+            self.pending_reads = set()
+        
         # Leave room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
-
-        # Notify others that user left
         if hasattr(self, 'room_group_name'):
-            await self.channel_layer.group_send(
+            await self.channel_layer.group_discard(
                 self.room_group_name,
-                {
-                    'type': 'user_left',
-                    'user_id': self.user.id,
-                    'username': self.user.username
-                }
+                self.channel_name
             )
 
+        if getattr(self, 'present', False):
+            self.present = False
+            await self.update_presence(join=False)
+            await self.schedule_presence_broadcast()
+
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
         message_type = text_data_json.get('type')
@@ -183,20 +269,26 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 )
 
         elif message_type == 'typing':
-            # Broadcast typing indicator
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'user_typing',
-                    'user_id': self.user.id,
-                    'username': self.user.username,
-                    'is_typing': text_data_json.get('is_typing', False)
-                }
-            )
+            is_typing = bool(text_data_json.get('is_typing', False))
+            if not is_typing and not self.typing_sent and not self.typing_pending:
+                # Already relayed as stopped; nothing new to say
+                return
+            self.typing_state = is_typing
+            self.typing_pending = True
+            if self.typing_task is None:
+                await self.relay_typing()
+
+        elif message_type == 'load_history':
+            # Scroll back: the client passes the next_cursor of the oldest page it has
+            await self.send_history(text_data_json.get('before'), text_data_json.get('limit'))
 
         elif message_type == 'mark_read':
-            message_id = text_data_json.get('message_id')
-            await self.mark_message_read(message_id)
+            message_ids = text_data_json.get('message_ids') or [text_data_json.get('message_id')]
+            self.pending_reads.update(str(message_id) for message_id in message_ids if message_id)
+            if not self.READ_COALESCE_MS:
+                await self.flush_reads()
+            elif self.read_task is None:
+                self.read_task = asyncio.ensure_future(self.flush_reads_after(self.READ_COALESCE_MS / 1000))
 
     async def chat_message(self, event):
         """Receive chat message from room group"""
@@ -210,22 +302,12 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'message': message
         }))
 
-    async def user_joined(self, event):
-        """Handle user joined event"""
+    async def presence_update(self, event):
+        """Receive an aggregated presence snapshot for the room"""
         await self.send(text_data=json.dumps({
-            'type': 'user_joined',
-            'user_id': event['user_id'],
-            'username': event['username'],
-            'timestamp': await self.get_current_timestamp()
-        }))
-
-    async def user_left(self, event):
-        """Handle user left event"""
-        await self.send(text_data=json.dumps({
-            'type': 'user_left',
-            'user_id': event['user_id'],
-            'username': event['username'],
-            'timestamp': await self.get_current_timestamp()
+            'type': 'presence',
+            'online': event['online'],
+            'timestamp': event['timestamp']
         }))
 
     async def user_typing(self, event):
@@ -235,76 +317,167 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'type': 'user_typing',
                 'user_id': event['user_id'],
                 'username': event['username'],
-                'is_typing': event['is_typing']
+                'is_typing': event['is_typing'],
+                'timestamp': event['timestamp']
             }))
 
-    @database_sync_to_async
-    def is_room_participant(self):
+    async def schedule_presence_broadcast(self):
+        """Make sure one presence snapshot goes out for the room shortly"""
+        delay = self.PRESENCE_INTERVAL_MS / 1000
+        if await self.claim_presence_broadcast(delay):
+            asyncio.ensure_future(self.broadcast_presence_after(delay))
+
+    async def relay_typing(self):
+        """Relay the latest typing state if the (user, room) window allows, else retry when it closes"""
+        window = self.TYPING_THROTTLE_MS / 1000
+        if self.typing_pending and await self.claim_typing(window):
+            self.typing_pending = False
+            self.typing_sent = self.typing_state
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'user_typing',
+                    'user_id': self.user.id,
+                    'username': self.user.username,
+                    'is_typing': self.typing_state,
+                    'timestamp': timezone.now().isoformat()
+                }
+            )
+        if self.typing_pending and self.typing_task is None:
+            self.typing_task = asyncio.ensure_future(self.relay_typing_after(window))
+
+    async def relay_typing_after(self, delay):
+        await asyncio.sleep(delay)
+        self.typing_task = None
+        await self.relay_typing()
+
+    async def presence_heartbeat(self):
+        """Refresh this connection's presence counter for as long as it stays open"""
+        while True:
+            await asyncio.sleep(RoomPresence.HEARTBEAT)
+            await self.refresh_presence()
+
+    async def broadcast_presence_after(self, delay):
+        await asyncio.sleep(delay)
+        # Release first so a change after the snapshot is read schedules another one
+        await self.release_presence_broadcast()
+        snapshot = await self.presence_snapshot()
+        await self.channel_layer.group_send(self.room_group_name, {
+            'type': 'presence_update',
+            'online': snapshot['online'],
+            'timestamp': snapshot['timestamp']
+        })
+
+    async def send_history(self, before=None, limit=None):
         try:
-            room = ChatRoom.objects.get(id=self.room_id, participants=self.user)
-            return True
-        except ChatRoom.DoesNotExist:
-            return False
+            messages, next_cursor = await self.get_history(before, limit)
+        except ValueError:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'error': 'invalid history request'
+            }))
+            return
+        
+        for message in messages:
+            message['is_own_message'] = message['sender']['id'] == self.user.id
+        
+        await self.send(text_data=json.dumps({
+            'type': 'message_history',
+            'messages': messages,
+            'before': before,
+            'next_cursor': next_cursor
+        }))
 
     @database_sync_to_async
     def get_room_info(self):
-        room = ChatRoom.objects.get(id=self.room_id)
-        return {
-            'id': str(room.id),
-            'name': room.name,
-            'description': room.description,
-            'room_type': room.room_type,
-            'participant_count': room.participants.count(),
-            'created_by': room.created_by.username
-        }
+        return ChatRooms.info(self.room_id)
 
     @database_sync_to_async
-    def get_recent_messages(self):
-        messages = ChatMessage.objects.filter(room_id=self.room_id).select_related('sender').order_by('created_at')[:50]
-        
-        message_list = []
-        for message in messages:
-            message_list.append({
-                'id': str(message.id),
-                'content': message.content,
-                'sender': {
-                    'id': message.sender.id,
-                    'username': message.sender.username,
-                    'first_name': message.sender.first_name,
-                    'last_name': message.sender.last_name,
-                },
-                'timestamp': message.created_at.isoformat(),
-                'is_edited': message.is_edited,
-                'is_own_message': message.sender == self.user
-            })
-        
-        return message_list
+    def get_history(self, before=None, limit=None):
+        return ChatHistory.page(self.room_id, before=before, limit=limit)
 
     @database_sync_to_async
     def save_message(self, content):
-        room = ChatRoom.objects.get(id=self.room_id)
         message = ChatMessage.objects.create(
-            room=room,
+            room_id=self.room_id,
             sender=self.user,
             content=content
         )
         return message
 
+    async def flush_reads_after(self, delay):
+        await asyncio.sleep(delay)
+        self.read_task = None
+        await self.flush_reads()
+
+    async def flush_reads(self):
+        """Advance the read watermark once for every mark_read received in the window"""
+        message_ids, self.pending_reads = list(self.pending_reads), set()
+        if not message_ids:
+            return
+        
+        if await self.mark_messages_read(message_ids):
+            await self.send(text_data=json.dumps({
+                'type': 'unread_count',
+                'room_id': self.room_id,
+                'unread_count': await self.get_unread_count()
+            }))
+
     @database_sync_to_async
-    def mark_message_read(self, message_id):
-        try:
-            message = ChatMessage.objects.get(id=message_id)
-            message.read_by.add(self.user)
-        except ChatMessage.DoesNotExist:
-            pass
+    def mark_messages_read(self, message_ids):
+        valid_ids = []
+        for message_id in message_ids:
+            try:
+                valid_ids.append(uuid.UUID(message_id))
+            except ValueError:
+                # Malformed message id
+                continue
+        return bool(valid_ids) and ChatReads.mark_read(self.user.id, self.room_id, valid_ids)
+
+    @database_sync_to_async
+    def get_unread_count(self):
+        return ChatReads.unread_count(self.user.id, self.room_id)
+
+    @database_sync_to_async
+    def presence_snapshot(self):
+        room_info = ChatRooms.info(self.room_id) or {'participant_ids': [], 'participant_names': {}}
+        online = RoomPresence.online(self.room_id, room_info['participant_ids'])
+        return {
+            'type': 'presence',
+            'online': [{'id': user_id, 'username': room_info['participant_names'].get(user_id)} for user_id in online],
+            'timestamp': timezone.now().isoformat()
+        }
+
+    @sync_to_async
+    def update_presence(self, join):
+        if join:
+            RoomPresence.join(self.room_id, self.user.id)
+        else:
+            RoomPresence.leave(self.room_id, self.user.id)
+
+    @sync_to_async
+    def claim_typing(self, window):
+        return RoomPresence.claim_typing(self.room_id, self.user.id, window)
+
+    @sync_to_async
+    def refresh_presence(self):
+        RoomPresence.heartbeat(self.room_id, self.user.id)
+
+    @sync_to_async
+    def claim_presence_broadcast(self, delay):
+        return RoomPresence.claim_broadcast(self.room_id, delay)
 
     @sync_to_async
-    def get_current_timestamp(self):
-        from django.utils import timezone
-        return timezone.now().isoformat()
+    def release_presence_broadcast(self):
+        RoomPresence.release_broadcast(self.room_id)
 
 class AnalyticsConsumer(AsyncWebsocketConsumer):
-    """Real-time analytics updates"""
+    """Real-time analytics updates.
+    
+    The initial frame is the user's cached weekly snapshot; afterwards
+    core.analytics.LiveAnalytics pushes analytics_update frames holding only
+    the metrics that changed.
+    """
     async def connect(self):
         self.user = self.scope["user"]
         
@@ -312,7 +485,7 @@ class AnalyticsConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
         
-        self.analytics_group_name = f'analytics_{self.user.id}'
+        self.analytics_group_name = LiveAnalytics.group_name(self.user.id)
         
         # Join analytics group
         await self.channel_layer.group_add(
@@ -330,13 +503,14 @@ class AnalyticsConsumer(AsyncWebsocketConsumer):
         }))
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.analytics_group_name,
-            self.channel_name
-        )
+        if hasattr(self, 'analytics_group_name'):
+            await self.channel_layer.group_discard(
+                self.analytics_group_name,
+                self.channel_name
+            )
 
     async def analytics_update(self, event):
-        """Receive analytics update"""
+        """Receive changed metrics"""
         await self.send(text_data=json.dumps({
             'type': 'analytics_update',
             'data': event['data']
@@ -344,30 +518,4 @@ class AnalyticsConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_initial_analytics(self):
-        from core.models import ProgressTracker, Task
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        
-        # Get weekly stats
-        weekly_progress = ProgressTracker.objects.filter(
-            user=self.user,
-            date__range=[week_ago, today]
-        )
-        
-        total_study = weekly_progress.aggregate(Sum('study_hours'))['study_hours__sum'] or 0
-        avg_productivity = weekly_progress.aggregate(Avg('productivity_score'))['productivity_score__avg'] or 0
-        tasks_completed = Task.objects.filter(
-            user=self.user,
-            status='completed',
-            completed_at__date__range=[week_ago, today]
-        ).count()
-        
-        return {
-            'weekly_study_hours': round(total_study, 1),
-            'weekly_productivity': round(avg_productivity, 1),
-            'weekly_tasks_completed': tasks_completed,
-            'current_streak': self.user.profile.streak_count
-        }
\ No newline at end of file
+        return LiveAnalytics.snapshot(self.user.id)
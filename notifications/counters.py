@@ -0,0 +1,135 @@
+from collections import defaultdict
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+import logging
+
+from .models import Notification, NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+
+class UnreadCounter:
+    """Per-user unread notification counts stored in NotificationCounter.
+
+    Counts are moved with single atomic UPDATEs on create and read, so readers
+    never have to COUNT notification rows. A counter row is seeded from the
+    real count the first time a user is seen, and reconcile() periodically
+    corrects any drift left by paths that bypass the counter (raw deletes,
+    QuerySet.update, ...).
+    """
+
+    @staticmethod
+    def get(user_id):
+        """Current unread count for a user"""
+        count = NotificationCounter.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first()
+        if count is None:
+            count = UnreadCounter._seed(user_id)
+        return count
+
+    @staticmethod
+    def increment(user_id, amount=1):
+        updated = NotificationCounter.objects.filter(user_id=user_id).update(
+            unread_count=F('unread_count') + amount
+        )
+        if not updated:
+            # The seed counts the rows that were just inserted as well
+            UnreadCounter._seed(user_id)
+
+    @staticmethod
+    def increment_many(amounts):
+        """Increment several users at once from a {user_id: amount} mapping"""
+        if not amounts:
+            return
+
+        existing = set(
+            NotificationCounter.objects.filter(user_id__in=list(amounts)).values_list('user_id', flat=True)
+        )
+
+        # One UPDATE per distinct amount; a bulk run usually gives everyone the same amount
+        by_amount = defaultdict(list)
+        for user_id, amount in amounts.items():
+            if user_id in existing:
+                by_amount[amount].append(user_id)
+        for amount, user_ids in by_amount.items():
+            NotificationCounter.objects.filter(user_id__in=user_ids).update(unread_count=F('unread_count') + amount)
+
+        missing = [user_id for user_id in amounts if user_id not in existing]
+        if missing:
+            UnreadCounter._seed_many(missing)
+
+    @staticmethod
+    def decrement(user_id, amount=1):
+        updated = NotificationCounter.objects.filter(user_id=user_id).update(
+            unread_count=Greatest(F('unread_count') - amount, 0)
+        )
+        if not updated:
+            UnreadCounter._seed(user_id)
+
+    @staticmethod
+    def mark_read(user_id, notification_ids):
+        """Mark notifications read and move the counter by the rows actually changed"""
+        changed = Notification.objects.filter(
+            user_id=user_id,
+            id__in=notification_ids,
+            is_read=False
+        ).update(is_read=True)
+
+        if changed:
+            UnreadCounter.decrement(user_id, changed)
+        return changed
+
+    @staticmethod
+    def recount(user_id):
+        """Recompute one user's counter, e.g. after rows were inserted without signals"""
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        NotificationCounter.objects.update_or_create(user_id=user_id, defaults={'unread_count': count})
+        return count
+
+    @staticmethod
+    def reconcile():
+        """Recompute every counter from the notifications table with one GROUP BY"""
+        now = timezone.now()
+        counts = dict(
+            Notification.objects.filter(is_read=False)
+            .values('user_id')
+            .annotate(unread=Count('id'))
+            .values_list('user_id', 'unread')
+        )
+
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=user_id, unread_count=unread, reconciled_at=now)
+             for user_id, unread in counts.items()],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['unread_count', 'reconciled_at'],
+            batch_size=500
+        )
+
+        # Users whose notifications were all read or deleted
+        cleared = NotificationCounter.objects.filter(unread_count__gt=0).exclude(reconciled_at=now).update(
+            unread_count=0,
+            reconciled_at=now
+        )
+
+        logger.info(f"Reconciled unread counters for {len(counts)} users ({cleared} cleared)")
+        return len(counts)
+
+    @staticmethod
+    def _seed(user_id):
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        NotificationCounter.objects.get_or_create(user_id=user_id, defaults={'unread_count': count})
+        return count
+
+    @staticmethod
+    def _seed_many(user_ids):
+        counts = dict(
+            Notification.objects.filter(user_id__in=user_ids, is_read=False)
+            .values('user_id')
+            .annotate(unread=Count('id'))
+            .values_list('user_id', 'unread')
+        )
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=user_id, unread_count=counts.get(user_id, 0)) for user_id in user_ids],
+            ignore_conflicts=True
+        )
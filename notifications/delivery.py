@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+EXTERNAL_CHANNELS = ('push', 'email')
+
+
+class DeliveryQueue:
+    """Per-user deferred delivery for push and email notifications.
+
+    Notifications are never pushed the moment they are generated. Each one is
+    held until the end of the current coalescing window, or until the end of the
+    user's quiet hours, and everything a user has pending at that point is sent
+    as a single batched push and a single email.
+    """
+
+    COALESCE_SECONDS = getattr(settings, 'NOTIFICATION_COALESCE_SECONDS', 120)
+    USERS_PER_CHUNK = 100
+    BATCH_PREVIEW_SIZE = 5
+
+    @staticmethod
+    def channels_for(preference, push=True, email=True):
+        """External channels a user accepts, given their PreferenceRecord"""
+        if not preference:
+            return []
+
+        channels = []
+        if push and preference.push_enabled:
+            channels.append('push')
+        if email and preference.email_enabled:
+            channels.append('email')
+        return channels
+
+    @staticmethod
+    def in_quiet_hours(preference, local_time):
+        """Check whether a local wall-clock time falls inside the user's quiet hours"""
+        if not preference or not preference.quiet_hours_enabled:
+            return False
+
+        start, end = preference.quiet_hours_start, preference.quiet_hours_end
+        if start <= end:
+            return start <= local_time < end
+        # Quiet hours wrap past midnight (e.g. 22:00 - 06:00)
+        return local_time >= start or local_time < end
+
+    @classmethod
+    def release_time(cls, preference, now=None):
+        """When a notification generated at `now` should be delivered"""
+        now = now or timezone.now()
+        local_now = timezone.localtime(now)
+
+        if cls.in_quiet_hours(preference, local_now.time()):
+            release = timezone.make_aware(
+                datetime.combine(local_now.date(), preference.quiet_hours_end),
+                local_now.tzinfo
+            )
+            if release <= local_now:
+                release += timedelta(days=1)
+            return release
+
+        # Align to the window grid so a burst shares one release time
+        window = cls.COALESCE_SECONDS
+        elapsed = int(now.timestamp()) % window
+        return now + timedelta(seconds=window - elapsed)
+
+    @classmethod
+    def flush(cls, now=None):
+        """Deliver every due notification, one batch per user per channel, returning rows delivered"""
+        now = now or timezone.now()
+        delivered = users = 0
+        while True:
+            batches = cls._claim(now)
+            if not batches:
+                break
+            cls._send(batches)
+            delivered += sum(len(rows) for rows in batches.values())
+            users += len(batches)
+
+        if delivered:
+            logger.info(f"Flushed {delivered} deferred notifications for {users} users")
+        return delivered
+
+    @classmethod
+    def _claim(cls, now):
+        """Mark the next USERS_PER_CHUNK users' due rows as sent and return them, {user id: rows}
+
+        Rows are claimed before anything goes out, so a flush cut short by a
+        time limit or a crash can at worst drop one chunk's batches; it never
+        sends the same batch again on the next run.
+        """
+        due = Notification.objects.filter(is_sent=False, scheduled_for__lte=now)
+        with transaction.atomic():
+            user_ids = list(
+                due.order_by('user_id').values_list('user_id', flat=True).distinct()[:cls.USERS_PER_CHUNK]
+            )
+            if not user_ids:
+                return {}
+            rows = list(
+                due.filter(user_id__in=user_ids)
+                .select_for_update(skip_locked=True)
+                .order_by('user_id', 'created_at')
+                .values_list('id', 'user_id', 'title', 'message', 'channels')
+            )
+            Notification.objects.filter(id__in=[row[0] for row in rows]).update(is_sent=True, sent_at=timezone.now())
+
+        return {user_id: list(user_rows) for user_id, user_rows in groupby(rows, key=lambda row: row[1])}
+
+    @classmethod
+    def _send(cls, batches):
+        from .tasks import NotificationEngine
+
+        users = User.objects.select_related('profile').in_bulk(list(batches))
+        for user_id, rows in batches.items():
+            user = users.get(user_id)
+            if not user:
+                continue
+
+            for channel in EXTERNAL_CHANNELS:
+                entries = [(title, message) for _, _, title, message, channels in rows if channel in channels]
+                if not entries:
+                    continue
+
+                title, message = cls._batch_content(entries)
+                if channel == 'push':
+                    NotificationEngine.send_push_notification(user, title, message, data={'count': len(entries)})
+                else:
+                    NotificationEngine.send_email_notification(user, title, message)
+
+    @classmethod
+    def _batch_content(cls, entries):
+        """Collapse several notifications into one title and message"""
+        if len(entries) == 1:
+            return entries[0]
+
+        lines = [f"• {title}" for title, _ in entries[:cls.BATCH_PREVIEW_SIZE]]
+        remaining = len(entries) - cls.BATCH_PREVIEW_SIZE
+        if remaining > 0:
+            lines.append(f"…and {remaining} more")
+
+        return f"🔔 {len(entries)} new notifications", "\n".join(lines)
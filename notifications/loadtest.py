@@ -0,0 +1,276 @@
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from contextlib import ExitStack, asynccontextmanager
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import override_settings
+import asyncio
+import json
+import logging
+import time
+import tracemalloc
+
+from core.models import ChatRoom
+from core.telemetry import QueryCollector
+from .consumers import ChatConsumer, NotificationConsumer
+from .counters import UnreadCounter
+from .realtime import notification_group_name
+
+logger = logging.getLogger(__name__)
+
+LOADTEST_PREFIX = 'wsload'
+
+
+class WebSocketLoadTest:
+    """In-process load test of the notification and chat websocket consumers.
+
+    Every simulated client opens a notification socket and a socket to one
+    of `rooms` chat rooms through channels' WebsocketCommunicator, on an
+    in-memory channel layer and a local-memory cache, so nothing outside the
+    process is needed. Each client then receives a burst of notifications
+    and the rooms exchange chat messages. Payloads carry their send time, so
+    the report gives connect and delivery latency percentiles, database
+    queries per delivered message and traced memory per open connection.
+
+    Users and rooms are created in the current database; run it against a
+    throwaway one (the ws_loadtest command uses a test database).
+    """
+
+    SETTINGS = {
+        'CHANNEL_LAYERS': {
+            'default': {
+                'BACKEND': 'channels.layers.InMemoryChannelLayer',
+                'CONFIG': {'capacity': 10000},
+            },
+        },
+        'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    }
+
+    def __init__(self, clients=1000, burst=20, rooms=20, chat_messages=5, coalesce_ms=None,
+                 concurrency=200, timeout=60, log=None):
+        self.clients = clients
+        self.burst = burst
+        self.rooms = max(1, min(rooms, clients))
+        self.chat_messages = chat_messages
+        self.coalesce_ms = coalesce_ms
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.log = log or logger.info
+
+    def run(self):
+        """Run the whole scenario and return the report dict"""
+        with override_settings(**self.SETTINGS):
+            self.users, self.room_members = self._create_fixtures()
+            return async_to_sync(self._run)()
+
+    def _create_fixtures(self):
+        User.objects.bulk_create(
+            [User(username=f'{LOADTEST_PREFIX}{index}') for index in range(self.clients)],
+            ignore_conflicts=True
+        )
+        users = list(User.objects.filter(username__startswith=LOADTEST_PREFIX).order_by('id')[:self.clients])
+        for user in users:
+            # Seed the unread counters so the run measures steady-state counts
+            UnreadCounter.get(user.id)
+
+        room_members = {}
+        for index in range(self.rooms):
+            members = users[index::self.rooms]
+            room = ChatRoom.objects.create(name=f'{LOADTEST_PREFIX} room {index}', created_by=members[0])
+            room.participants.add(*members)
+            room_members[str(room.id)] = members
+
+        self.log(f"Created {len(users)} users in {len(room_members)} rooms")
+        return users, room_members
+
+    async def _run(self):
+        tracemalloc.start()
+        memory_before, _ = tracemalloc.get_traced_memory()
+
+        notification_sockets, notification_connect = await self._connect_all(
+            [(user, self._notification_path(), NotificationConsumer, None) for user in self.users]
+        )
+        chat_sockets, chat_connect = await self._connect_all([
+            (user, f'/ws/chat/{room_id}/', ChatConsumer, room_id)
+            for room_id, members in self.room_members.items()
+            for user in members
+        ])
+
+        memory_after, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        connections = len(notification_sockets) + len(chat_sockets)
+        self.log(f"Opened {connections} connections")
+
+        # Let the connect-time presence broadcasts settle before measuring traffic
+        await self._drain(chat_sockets, quiet=ChatConsumer.PRESENCE_INTERVAL_MS / 1000 + 0.5)
+
+        report = {
+            'clients': len(self.users),
+            'connections': connections,
+            'connect_ms': {
+                'notifications': percentiles(notification_connect),
+                'chat': percentiles(chat_connect),
+            },
+            'memory_per_connection_kb': round((memory_after - memory_before) / max(connections, 1) / 1024, 2),
+            'memory_peak_mb': round(memory_peak / 1024 / 1024, 2),
+        }
+
+        report['notifications'] = await self._notification_burst(notification_sockets)
+        self.log(f"Notification burst: {report['notifications']['received']} delivered")
+        report['chat'] = await self._chat_traffic(chat_sockets)
+        self.log(f"Chat traffic: {report['chat']['received']} delivered")
+
+        await asyncio.gather(*(communicator.disconnect() for communicator, _ in notification_sockets + chat_sockets))
+        return report
+
+    def _notification_path(self):
+        if self.coalesce_ms is None:
+            return '/ws/notifications/'
+        return f'/ws/notifications/?coalesce_ms={self.coalesce_ms}'
+
+    async def _connect_all(self, targets):
+        """Open sockets `concurrency` at a time, returning ([(communicator, user)], connect latencies in ms)"""
+        sockets = []
+        latencies = []
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def open_socket(user, path, consumer, room_id):
+            async with semaphore:
+                communicator = WebsocketCommunicator(consumer.as_asgi(), path)
+                communicator.scope['user'] = user
+                if room_id:
+                    communicator.scope['url_route'] = {'kwargs': {'room_id': room_id}}
+
+                started = time.perf_counter()
+                connected, _ = await communicator.connect(timeout=self.timeout)
+                if not connected:
+                    return
+                # Connected means the first frame (count or room info) has arrived
+                await communicator.receive_from(timeout=self.timeout)
+                latencies.append((time.perf_counter() - started) * 1000)
+                sockets.append((communicator, user))
+
+        await asyncio.gather(*(open_socket(*target) for target in targets))
+        return sockets, latencies
+
+    async def _notification_burst(self, sockets):
+        channel_layer = get_channel_layer()
+        latencies = []
+        frames = 0
+        expected = len(sockets) * self.burst
+
+        async with count_queries() as collector:
+            for index in range(self.burst):
+                for _, user in sockets:
+                    await channel_layer.group_send(notification_group_name(user.id), {
+                        'type': 'notification_message',
+                        'notification': {'id': f'{user.id}-{index}', 'title': 'Load test', 'sent_at': time.perf_counter()},
+                    })
+
+            async def read(communicator):
+                nonlocal frames
+                received = 0
+                while received < self.burst:
+                    frame = json.loads(await communicator.receive_from(timeout=self.timeout))
+                    if frame['type'] != 'new_notifications':
+                        continue
+                    frames += 1
+                    now = time.perf_counter()
+                    for notification in frame['notifications']:
+                        latencies.append((now - notification['sent_at']) * 1000)
+                    received += frame['count']
+
+            await asyncio.gather(*(read(communicator) for communicator, _ in sockets))
+
+        return self._traffic_report(expected, latencies, frames, collector, sent=expected)
+
+    async def _chat_traffic(self, sockets):
+        by_room = {}
+        for communicator, user in sockets:
+            by_room.setdefault(communicator.scope['url_route']['kwargs']['room_id'], []).append((communicator, user))
+
+        latencies = []
+        frames = 0
+        sent = 0
+        expected = 0
+
+        async with count_queries() as collector:
+            for index in range(self.chat_messages):
+                for members in by_room.values():
+                    communicator, _ = members[index % len(members)]
+                    await communicator.send_to(text_data=json.dumps({
+                        'type': 'chat_message',
+                        'message': json.dumps({'sent_at': time.perf_counter()}),
+                    }))
+                    sent += 1
+                    expected += len(members)
+
+            async def read(communicator):
+                nonlocal frames
+                received = 0
+                while received < self.chat_messages:
+                    frame = json.loads(await communicator.receive_from(timeout=self.timeout))
+                    if frame['type'] != 'chat_message':
+                        continue
+                    frames += 1
+                    received += 1
+                    content = json.loads(frame['message']['content'])
+                    latencies.append((time.perf_counter() - content['sent_at']) * 1000)
+
+            await asyncio.gather(*(read(communicator) for communicator, _ in sockets))
+
+        return self._traffic_report(expected, latencies, frames, collector, sent=sent)
+
+    async def _drain(self, sockets, quiet):
+        async def drain(communicator):
+            while not await communicator.receive_nothing(timeout=quiet):
+                await communicator.receive_output()
+
+        await asyncio.gather(*(drain(communicator) for communicator, _ in sockets))
+
+    @staticmethod
+    def _traffic_report(expected, latencies, frames, collector, sent):
+        return {
+            'sent': sent,
+            'received': len(latencies),
+            'expected': expected,
+            'frames': frames,
+            'latency_ms': percentiles(latencies),
+            'queries': collector.queries,
+            'queries_per_message': round(collector.queries / max(sent, 1), 3),
+        }
+
+
+@asynccontextmanager
+async def count_queries():
+    """Count the queries the consumers run meanwhile.
+
+    Consumers reach the database through database_sync_to_async, on the
+    sync thread's connection, so the wrapper is installed from there too.
+    """
+    collector = QueryCollector()
+    stack = ExitStack()
+    await sync_to_async(lambda: stack.enter_context(connection.execute_wrapper(collector)))()
+    try:
+        yield collector
+    finally:
+        await sync_to_async(stack.close)()
+
+
+def percentiles(values):
+    """p50/p95/p99/max of a list of numbers, rounded to 0.01"""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def pick(fraction):
+        return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 2)
+
+    return {
+        'count': len(ordered),
+        'p50': pick(0.50),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'max': round(ordered[-1], 2),
+    }
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications.retention import NotificationRetention
+
+class Command(BaseCommand):
+    help = 'Purge old notifications in bounded chunks, optionally archiving them first'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.NOTIFICATION_RETENTION_DAYS,
+            help='Delete notifications older than this many days',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            default=settings.NOTIFICATION_ARCHIVE_ENABLED,
+            help='Write rows to monthly .ndjson.gz files before deleting them',
+        )
+
+    def handle(self, *args, **options):
+        deleted = NotificationRetention(
+            days=options['days'],
+            chunk_size=options['chunk_size'],
+            archive=options['archive'],
+        ).run()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Purged {deleted} notifications older than {options["days"]} days')
+        )
@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from notifications.loadtest import WebSocketLoadTest
+
+class Command(BaseCommand):
+    help = 'Load test the notification and chat websockets in-process against a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=1000,
+            help='Simulated users; each opens a notification and a chat socket',
+        )
+        parser.add_argument(
+            '--burst',
+            type=int,
+            default=20,
+            help='Notifications pushed to every client',
+        )
+        parser.add_argument(
+            '--rooms',
+            type=int,
+            default=20,
+            help='Chat rooms the clients are spread across',
+        )
+        parser.add_argument(
+            '--chat-messages',
+            type=int,
+            default=5,
+            help='Messages sent in every room',
+        )
+        parser.add_argument(
+            '--coalesce-ms',
+            type=int,
+            help='Notification coalescing window requested by the clients (default: server setting)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Sockets opening at the same time',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait for any single frame',
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        log = (lambda message: self.stdout.write(f'⏳ {message}')) if verbosity > 1 else (lambda message: None)
+
+        # Never write thousands of fake users into the real database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        try:
+            report = WebSocketLoadTest(
+                clients=options['clients'],
+                burst=options['burst'],
+                rooms=options['rooms'],
+                chat_messages=options['chat_messages'],
+                coalesce_ms=options['coalesce_ms'],
+                concurrency=options['concurrency'],
+                timeout=options['timeout'],
+                log=log,
+            ).run()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(
+            f"{report['clients']} clients, {report['connections']} connections, "
+            f"{report['memory_per_connection_kb']} KB/connection (peak {report['memory_peak_mb']} MB traced)"
+        )
+        self.stdout.write('')
+        self.stdout.write(f"{'latency (ms)':<24}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+        rows = [
+            ('connect notifications', report['connect_ms']['notifications']),
+            ('connect chat', report['connect_ms']['chat']),
+            ('notification delivery', report['notifications']['latency_ms']),
+            ('chat delivery', report['chat']['latency_ms']),
+        ]
+        for label, stats in rows:
+            self.stdout.write(
+                f"{label:<24}{stats['count']:>8}"
+                + ''.join(f"{stats.get(key, '-'):>10}" for key in ('p50', 'p95', 'p99', 'max'))
+            )
+
+        self.stdout.write('')
+        for label, traffic in (('notifications', report['notifications']), ('chat', report['chat'])):
+            self.stdout.write(
+                f"{label:<14} sent {traffic['sent']}, delivered {traffic['received']}/{traffic['expected']} "
+                f"in {traffic['frames']} frames, {traffic['queries']} queries "
+                f"({traffic['queries_per_message']} per message)"
+            )
+
+        delivered = all(traffic['received'] == traffic['expected'] for traffic in (report['notifications'], report['chat']))
+        if delivered:
+            self.stdout.write(self.style.SUCCESS('✅ Every message delivered'))
+        else:
+            self.stdout.write(self.style.WARNING('⚠️ Some messages were not delivered'))
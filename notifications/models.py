@@ -22,7 +22,16 @@ class Notification(models.Model):
     related_model = models.CharField(max_length=50, blank=True)
     related_id = models.UUIDField(null=True, blank=True)
     action_url = models.URLField(blank=True)
+    priority = models.IntegerField(default=1)
+    
+    # Hash of (user, kind, subject, date); repeated task runs insert the same key and are skipped
+    dedupe_key = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False)
+    
+    # Delivery over external channels (push, email) is deferred until scheduled_for
+    channels = models.JSONField(default=list, blank=True)
     scheduled_for = models.DateTimeField(null=True, blank=True)
+    is_sent = models.BooleanField(default=False)
+    sent_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -32,6 +41,7 @@ class Notification(models.Model):
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['user', 'notification_type']),
             models.Index(fields=['scheduled_for']),
+            models.Index(fields=['is_sent', 'scheduled_for']),
         ]
     
     def __str__(self):
@@ -60,6 +70,15 @@ class NotificationPreference(models.Model):
     quiet_hours_end = models.TimeField(default='06:00:00')
     quiet_hours_enabled = models.BooleanField(default=True)
     
+    # Activity reminder preferences
+    reminder_lead_time = models.IntegerField(default=15, help_text="Minutes before an activity to send a reminder")
+    enable_lecture_reminders = models.BooleanField(default=True)
+    enable_lab_reminders = models.BooleanField(default=True)
+    enable_study_reminders = models.BooleanField(default=True)
+    enable_workout_reminders = models.BooleanField(default=True)
+    enable_meal_reminders = models.BooleanField(default=True)
+    enable_relationship_reminders = models.BooleanField(default=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -69,4 +88,16 @@ class NotificationPreference(models.Model):
         verbose_name_plural = 'Notification Preferences'
     
     def __str__(self):
-        return f"{self.user.username}'s Notification Preferences"
\ No newline at end of file
+        return f"{self.user.username}'s Notification Preferences"
+
+class NotificationCounter(models.Model):
+    """Denormalized unread notification count, kept current with atomic updates"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread_count = models.IntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'notification_counters'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count} unread"
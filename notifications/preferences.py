@@ -0,0 +1,115 @@
+from collections import namedtuple
+from django.core.cache import cache
+import logging
+
+from .models import NotificationPreference
+
+logger = logging.getLogger(__name__)
+
+# Activity types that have a dedicated enable_<type>_reminders flag
+REMINDER_ACTIVITY_TYPES = ['lecture', 'lab', 'study', 'workout', 'meal', 'relationship']
+
+PreferenceRecord = namedtuple('PreferenceRecord', [
+    'push_enabled',
+    'push_reminders',
+    'email_enabled',
+    'email_reminders',
+    'quiet_hours_enabled',
+    'quiet_hours_start',
+    'quiet_hours_end',
+    'reminder_lead_time',
+    'activity_reminders',
+])
+
+
+class PreferenceMap:
+    """Compact per-user notification preferences, loaded once per task run.
+
+    The map is built from a single query over NotificationPreference and shared
+    between workers through the cache. Saving or deleting a preference bumps the
+    cache version, so the next load rebuilds the map instead of serving stale data.
+    """
+
+    VERSION_KEY = 'notification_prefs:version'
+    CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+    FIELDS = [
+        'user_id', 'push_enabled', 'push_reminders', 'email_enabled', 'email_reminders',
+        'quiet_hours_enabled', 'quiet_hours_start', 'quiet_hours_end', 'reminder_lead_time',
+    ] + [f'enable_{activity_type}_reminders' for activity_type in REMINDER_ACTIVITY_TYPES]
+
+    def __init__(self, records):
+        self._records = records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, user_id):
+        return user_id in self._records
+
+    def items(self):
+        return self._records.items()
+
+    def get(self, user_id):
+        """Return the PreferenceRecord for a user, or None if they have no preferences"""
+        return self._records.get(user_id)
+
+    @classmethod
+    def load(cls, use_cache=True):
+        """Load the preference map from the shared cache, falling back to one DB query"""
+        if not use_cache:
+            return cls(cls._load_records())
+
+        try:
+            cache_key = cls._cache_key(cls._current_version())
+            records = cache.get(cache_key)
+            if records is None:
+                records = cls._load_records()
+                cache.set(cache_key, records, cls.CACHE_TIMEOUT)
+            return cls(records)
+        except Exception as e:
+            logger.warning(f"Preference cache unavailable, loading from database: {e}")
+            return cls(cls._load_records())
+
+    @classmethod
+    def invalidate(cls):
+        """Bump the cache version so every worker reloads on its next run"""
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            # Version key expired or was never set
+            cache.set(cls.VERSION_KEY, 2, None)
+        except Exception as e:
+            logger.warning(f"Could not invalidate preference cache: {e}")
+
+    @classmethod
+    def _current_version(cls):
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, 1, None)
+            version = cache.get(cls.VERSION_KEY, 1)
+        return version
+
+    @classmethod
+    def _cache_key(cls, version):
+        return f'notification_prefs:v{version}'
+
+    @classmethod
+    def _load_records(cls):
+        records = {}
+        flag_offset = len(cls.FIELDS) - len(REMINDER_ACTIVITY_TYPES)
+
+        for row in NotificationPreference.objects.values_list(*cls.FIELDS).iterator():
+            records[row[0]] = PreferenceRecord(
+                push_enabled=row[1],
+                push_reminders=row[2],
+                email_enabled=row[3],
+                email_reminders=row[4],
+                quiet_hours_enabled=row[5],
+                quiet_hours_start=row[6],
+                quiet_hours_end=row[7],
+                reminder_lead_time=row[8],
+                activity_reminders=dict(zip(REMINDER_ACTIVITY_TYPES, row[flag_offset:])),
+            )
+
+        return records
@@ -0,0 +1,57 @@
+from collections import defaultdict
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def notification_group_name(user_id):
+    """Channel layer group that every NotificationConsumer of a user joins"""
+    return f'notifications_{user_id}'
+
+
+def serialize_notification(notification):
+    """JSON-safe payload sent to the client for a notification"""
+    return {
+        'id': str(notification.id),
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'action_url': notification.action_url,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def publish_notifications(notifications):
+    """Push newly created notifications to their owners' websocket groups.
+
+    Frames are sent once the surrounding transaction commits. A user receiving
+    several notifications at once gets a single notification_batch event
+    instead of one event per notification.
+    """
+    payloads = defaultdict(list)
+    for notification in notifications:
+        payloads[notification.user_id].append(serialize_notification(notification))
+
+    if payloads:
+        transaction.on_commit(lambda: _send_payloads(payloads))
+
+
+def _send_payloads(payloads):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    for user_id, user_payloads in payloads.items():
+        if len(user_payloads) == 1:
+            event = {'type': 'notification_message', 'notification': user_payloads[0]}
+        else:
+            event = {'type': 'notification_batch', 'notifications': user_payloads}
+
+        try:
+            async_to_sync(channel_layer.group_send)(notification_group_name(user_id), event)
+        except Exception as e:
+            logger.warning(f"Realtime publish failed for user {user_id}: {e}")
@@ -0,0 +1,121 @@
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+import gzip
+import json
+import logging
+
+from core.models import JobCheckpoint
+from .models import Notification
+from .counters import UnreadCounter
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationRetention:
+    """Bounded, resumable purge of old notifications.
+
+    Rows are removed oldest first in primary-key chunks, each in its own short
+    transaction, with a raw DELETE whenever nothing cascades from Notification.
+    Progress is stored in a JobCheckpoint so an interrupted run picks up where
+    it stopped, and rows can be archived to compressed monthly NDJSON files
+    before they are deleted.
+
+    Partitioning the table by month is out of scope: PostgreSQL requires the
+    primary key and every unique constraint to include the partition key,
+    and both the UUID id and the standalone dedupe_key (which ON CONFLICT
+    deduplication relies on) would have to change.
+    """
+
+    CHECKPOINT_NAME = 'notification_retention'
+    ARCHIVE_FIELDS = [
+        'id', 'user_id', 'title', 'message', 'notification_type', 'is_read', 'related_model',
+        'related_id', 'action_url', 'priority', 'channels', 'scheduled_for', 'is_sent', 'sent_at', 'created_at',
+    ]
+
+    def __init__(self, days=None, chunk_size=1000, archive=False, archive_dir=None):
+        self.days = days if days is not None else getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 30)
+        self.chunk_size = chunk_size
+        self.archive = archive
+        self.archive_dir = Path(archive_dir or getattr(settings, 'NOTIFICATION_ARCHIVE_DIR', settings.BASE_DIR / 'archives'))
+
+    def run(self, now=None):
+        """Purge notifications older than the retention window, returning rows deleted"""
+        cutoff = (now or timezone.now()) - timedelta(days=self.days)
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=self.CHECKPOINT_NAME)
+
+        deleted = self._delete_in_chunks(cutoff, checkpoint)
+
+        # Everything before the cutoff is gone, so the archive cursor can reset
+        checkpoint.watermark = cutoff
+        checkpoint.cursor = ''
+        checkpoint.state = {'rows_deleted': deleted, 'finished_at': timezone.now().isoformat()}
+        checkpoint.save()
+
+        if deleted:
+            # Raw deletes skip post_delete, so bring the unread counters back in line
+            UnreadCounter.reconcile()
+
+        logger.info(f"Notification retention removed {deleted} rows older than {cutoff:%Y-%m-%d}")
+        return deleted
+
+    def _delete_in_chunks(self, cutoff, checkpoint):
+        deleted = 0
+        archived_through = checkpoint.cursor
+
+        while True:
+            batch = list(
+                Notification.objects.filter(created_at__lt=cutoff)
+                .order_by('created_at', 'id')
+                .values_list('id', 'created_at')[:self.chunk_size]
+            )
+            if not batch:
+                break
+
+            ids = [pk for pk, _ in batch]
+            if self.archive:
+                # Rows archived by an interrupted run are not written twice
+                pending = [pk for pk, created_at in batch if self._cursor(created_at, pk) > archived_through]
+                self._archive(Notification.objects.filter(id__in=pending))
+                last_pk, last_created_at = batch[-1]
+                archived_through = self._cursor(last_created_at, last_pk)
+                checkpoint.cursor = archived_through
+                checkpoint.save(update_fields=['cursor', 'updated_at'])
+
+            with transaction.atomic():
+                deleted += self._delete(Notification.objects.filter(id__in=ids))
+
+        return deleted
+
+    def _delete(self, queryset):
+        if can_raw_delete():
+            return queryset._raw_delete(queryset.db)
+        count, _ = queryset.delete()
+        return count
+
+    def _archive(self, queryset):
+        """Append rows to gzip NDJSON files, one file per month of created_at"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        handles = {}
+        try:
+            for row in queryset.order_by('created_at').values(*self.ARCHIVE_FIELDS).iterator(chunk_size=self.chunk_size):
+                month = row['created_at'].strftime('%Y-%m')
+                if month not in handles:
+                    # Appending writes a new gzip member, which readers concatenate transparently
+                    handles[month] = gzip.open(self.archive_dir / f'notifications-{month}.ndjson.gz', 'at', encoding='utf-8')
+                handles[month].write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    @staticmethod
+    def _cursor(created_at, pk):
+        return f'{created_at.isoformat()}|{pk}'
+
+
+def can_raw_delete():
+    """Raw DELETEs are only safe when no other table references notifications"""
+    return not Notification._meta.related_objects
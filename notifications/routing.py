@@ -5,4 +5,6 @@ from . import consumers
 websocket_urlpatterns = [
     # The WebSocket will connect here, using user ID
     re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
+    re_path(r'ws/chat/(?P<room_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/$', consumers.ChatConsumer.as_asgi()),
+    re_path(r'ws/analytics/$', consumers.AnalyticsConsumer.as_asgi()),
 ]
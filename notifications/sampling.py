@@ -0,0 +1,55 @@
+from django.utils import timezone
+import hashlib
+import random
+
+
+class RecipientSampler:
+    """Deterministic daily sampling of recipients without loading users.
+
+    Every user is hashed into one of `slots` bands for the day, and each run
+    draws only from its own band, so someone picked at 10:00 is not picked
+    again at 14:00. Within a band the sample is taken with reservoir sampling
+    over an id iterator, so memory depends on the sample size only. The seed is
+    derived from the day and a salt, making a rerun of the same slot pick the
+    same users.
+    """
+
+    CHUNK_SIZE = 2000
+
+    def __init__(self, salt, slots=1, day=None):
+        self.slots = max(1, slots)
+        self.seed = f'{salt}:{(day or timezone.localdate()).isoformat()}'
+
+    def band(self, user_id):
+        """Band (0..slots-1) a user falls into for the day"""
+        digest = hashlib.blake2b(f'{self.seed}:{user_id}'.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % self.slots
+
+    def sample(self, user_ids, size, slot=0):
+        """Reservoir-sample up to `size` ids from an iterable, keeping only the slot's band"""
+        if size <= 0:
+            return []
+
+        rng = random.Random(f'{self.seed}:{slot}')
+        reservoir = []
+        seen = 0
+        for user_id in user_ids:
+            if self.slots > 1 and self.band(user_id) != slot:
+                continue
+
+            seen += 1
+            if len(reservoir) < size:
+                reservoir.append(user_id)
+            else:
+                index = rng.randrange(seen)
+                if index < size:
+                    reservoir[index] = user_id
+
+        return reservoir
+
+    def sample_queryset(self, queryset, fraction, slot=0):
+        """Sample roughly `fraction` of a user queryset, returning user ids"""
+        size = max(1, int(queryset.count() * fraction))
+        # Ordering by pk keeps the stream, and therefore the draw, stable between reruns
+        user_ids = queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=self.CHUNK_SIZE)
+        return self.sample(user_ids, size, slot)
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from notifications.models import Notification, NotificationPreference
+from notifications.preferences import PreferenceMap
+from notifications.counters import UnreadCounter
+
+@receiver(post_save, sender=NotificationPreference)
+def invalidate_preferences_on_save(sender, instance, **kwargs):
+    """Drop the cached preference map when a user changes their preferences"""
+    PreferenceMap.invalidate()
+
+@receiver(post_delete, sender=NotificationPreference)
+def invalidate_preferences_on_delete(sender, instance, **kwargs):
+    """Drop the cached preference map when preferences are removed"""
+    PreferenceMap.invalidate()
+
+@receiver(post_save, sender=Notification)
+def increment_unread_on_create(sender, instance, created, **kwargs):
+    """Count new unread notifications (bulk inserts update the counter themselves)"""
+    if created and not instance.is_read:
+        UnreadCounter.increment(instance.user_id)
+
+@receiver(post_delete, sender=Notification)
+def decrement_unread_on_delete(sender, instance, **kwargs):
+    """Stop counting unread notifications that are deleted one by one"""
+    if not instance.is_read:
+        UnreadCounter.decrement(instance.user_id)
\ No newline at end of file
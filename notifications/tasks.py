@@ -1,19 +1,39 @@
 from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
 from celery.schedules import crontab
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from datetime import datetime, timedelta
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+import hashlib
 import logging
 import requests
 import json
 
-from core.models import Schedule, Task, UserProfile, ProgressTracker, HabitCompletion
-from .models import Notification, NotificationTemplate, NotificationPreference
+from core.models import Schedule, Task, UserProfile, ProgressTracker, Habit
+from core.task_utils import single_instance
+from .models import Notification, NotificationPreference
+from .preferences import PreferenceMap
+from .delivery import DeliveryQueue, EXTERNAL_CHANNELS
+from .realtime import publish_notifications
+from .counters import UnreadCounter
+from .sampling import RecipientSampler
+from .ticker import MinuteTicker
 
 logger = logging.getLogger(__name__)
 
+DIGEST_BATCH_SIZE = 500
+
+# Seconds to wait on the push gateway; a hung request must not stall a whole flush
+PUSH_TIMEOUT = 10
+
+# Local hours of the motivational-messages beat entries
+MOTIVATIONAL_HOURS = (10, 14, 17)
+
 class NotificationEngine:
     """Comprehensive notification engine with multiple delivery channels"""
     
@@ -42,8 +62,10 @@ class NotificationEngine:
                 'data': data or {}
             }
             
-            response = requests.post(fcm_url, headers=headers, json=payload)
+            response = requests.post(fcm_url, headers=headers, json=payload, timeout=PUSH_TIMEOUT)
             return response.status_code == 200
+        except SoftTimeLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"Push notification failed for {user.username}: {e}")
             return False
@@ -70,6 +92,8 @@ class NotificationEngine:
                 fail_silently=False,
             )
             return True
+        except SoftTimeLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"Email notification failed for {user.username}: {e}")
             return False
@@ -81,42 +105,89 @@ class NotificationEngine:
         pass
     
     @staticmethod
-    def create_in_app_notification(user, title, message, notification_type='reminder', **kwargs):
-        """Create in-app notification"""
-        notification = Notification.objects.create(
-            user=user,
+    def dedupe_key(user_id, kind, subject='', day=None):
+        """Stable key identifying one logical notification, e.g. one reminder per activity per day"""
+        raw = f"{user_id}|{kind}|{subject}|{day.isoformat() if day else ''}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def build_notification(user, title, message, notification_type='reminder', channels=None, preference=None, **kwargs):
+        """Build an unsaved notification, queueing push/email delivery through the DeliveryQueue"""
+        channels = ['in_app'] + [channel for channel in (channels or []) if channel in EXTERNAL_CHANNELS]
+        
+        if len(channels) > 1 and 'scheduled_for' not in kwargs:
+            kwargs['scheduled_for'] = DeliveryQueue.release_time(preference)
+        
+        # Accept either a User or a bare user id so bulk callers can skip loading users
+        if isinstance(user, User):
+            kwargs['user'] = user
+        else:
+            kwargs['user_id'] = user
+        
+        return Notification(
             title=title,
             message=message,
             notification_type=notification_type,
-            channels=['in_app'],
+            channels=channels,
             **kwargs
         )
-        return notification
-
-@shared_task
-def schedule_daily_notifications():
-    """Master scheduler for all daily notifications"""
-    logger.info("Starting daily notification scheduling...")
     
-    # Schedule all notification types
-    send_morning_planning_notifications.delay()
-    schedule_activity_reminders.delay()
-    send_evening_review_reminders.delay()
-    check_task_deadlines.delay()
-    send_motivational_messages.delay()
-    check_habit_completions.delay()
+    @staticmethod
+    def create_in_app_notification(user, title, message, notification_type='reminder', **kwargs):
+        """Create in-app notification and push it to the user's open sockets.
+        
+        Returns None when a notification with the same dedupe_key already exists.
+        """
+        notification = NotificationEngine.build_notification(user, title, message, notification_type, **kwargs)
+        
+        if notification.dedupe_key:
+            created = NotificationEngine.bulk_create_in_app_notifications([notification])
+            return created[0] if created else None
+        
+        notification.save()
+        publish_notifications([notification])
+        return notification
     
-    logger.info("Daily notification scheduling completed")
+    @staticmethod
+    def bulk_create_in_app_notifications(notifications, batch_size=500):
+        """Insert many notifications built with build_notification and publish them in batches.
+        
+        Notifications carrying a dedupe_key are inserted only if absent; the
+        returned list holds just the rows that were actually inserted.
+        """
+        if any(notification.dedupe_key for notification in notifications):
+            Notification.objects.bulk_create(notifications, batch_size=batch_size, ignore_conflicts=True)
+            # Primary keys are generated client-side, so look up which rows made it in
+            candidate_ids = [notification.id for notification in notifications]
+            inserted_ids = set()
+            for start in range(0, len(candidate_ids), batch_size):
+                inserted_ids.update(
+                    Notification.objects.filter(id__in=candidate_ids[start:start + batch_size]).values_list('id', flat=True)
+                )
+            created = [notification for notification in notifications if notification.id in inserted_ids]
+        else:
+            created = Notification.objects.bulk_create(notifications, batch_size=batch_size)
+        
+        # bulk_create skips post_save, so move the unread counters here
+        UnreadCounter.increment_many(Counter(
+            notification.user_id for notification in created if not notification.is_read
+        ))
+        
+        publish_notifications(created)
+        return created
 
 @shared_task
+@single_instance()
 def send_morning_planning_notifications():
     """Send morning planning notifications at 5:45 AM"""
-    now = timezone.now()
-    if now.hour == 5 and now.minute == 45:
+    # Beat owns the exact time; only guard against runs outside the morning hour
+    now = timezone.localtime()
+    if now.hour == 5:
         users = User.objects.filter(is_active=True)
+        preferences = PreferenceMap.load()
         
         for user in users:
-            pref = getattr(user, 'notification_preferences', None)
+            pref = preferences.get(user.id)
             if pref and not pref.push_enabled:
                 continue
                 
@@ -131,105 +202,41 @@ def send_morning_planning_notifications():
             else:
                 message = "🌅 Good morning! You have a free day today. Perfect for working on your projects!"
             
-            # Send notification
+            # Send notification, pushing it too if enabled
             NotificationEngine.create_in_app_notification(
                 user=user,
                 title="🌅 Morning Planning Time",
                 message=message,
-                notification_type='system'
+                notification_type='system',
+                channels=DeliveryQueue.channels_for(pref, email=False),
+                preference=pref
             )
-            
-            # Send push notification if enabled
-            if pref and pref.push_enabled:
-                NotificationEngine.send_push_notification(user, "🌅 Morning Planning", message)
 
 @shared_task
-def schedule_activity_reminders():
-    """Schedule activity reminders with lead time"""
-    now = timezone.now()
-    users = User.objects.filter(is_active=True)
-    
-    for user in users:
-        pref = getattr(user, 'notification_preferences', None)
-        if not pref:
-            continue
-            
-        lead_time = pref.reminder_lead_time
-        reminder_time = now + timedelta(minutes=lead_time)
-        
-        # Get activities starting at reminder_time
-        current_day = now.strftime('%A')
-        upcoming_activities = Schedule.objects.filter(
-            user=user,
-            day=current_day,
-            start_time__hour=reminder_time.hour,
-            start_time__minute=reminder_time.minute,
-            is_active=True,
-            notification_sent=False
-        )
-        
-        for activity in upcoming_activities:
-            # Check if user wants reminders for this activity type
-            if not should_send_reminder(pref, activity.activity_type):
-                continue
-            
-            title = f"🕒 Coming Up: {activity.title}"
-            message = f"Starts in {lead_time} minutes at {activity.location or 'your scheduled location'}"
-            
-            # Create notification
-            notification = NotificationEngine.create_in_app_notification(
-                user=user,
-                title=title,
-                message=message,
-                notification_type='reminder',
-                related_schedule=activity
-            )
-            
-            # Send via preferred channels
-            if pref.push_enabled:
-                NotificationEngine.send_push_notification(user, title, message)
-            
-            if pref.email_enabled:
-                NotificationEngine.send_email_notification(user, title, message)
-            
-            # Mark as sent
-            activity.notification_sent = True
-            activity.save()
+@single_instance()
+def tick():
+    """Minute ticker: activity start notifications and lead-time reminders, then queue deferred delivery"""
+    created = MinuteTicker().run()
+    flush_deferred_notifications.delay()
+    return created
 
 @shared_task
-def send_activity_start_notifications():
-    """Send notifications when activities actually start"""
-    now = timezone.now()
-    current_day = now.strftime('%A')
-    
-    current_activities = Schedule.objects.filter(
-        day=current_day,
-        start_time__hour=now.hour,
-        start_time__minute=now.minute,
-        is_active=True
-    )
-    
-    for activity in current_activities:
-        title = f"⏰ Now: {activity.title}"
-        message = f"Time for {activity.get_activity_type_display()}! Focus and do your best. 🎯"
-        
-        NotificationEngine.create_in_app_notification(
-            user=activity.user,
-            title=title,
-            message=message,
-            notification_type='reminder',
-            related_schedule=activity
-        )
+@single_instance()
+def flush_deferred_notifications():
+    """Deliver held push/email notifications as one batch per user"""
+    return DeliveryQueue.flush()
 
 @shared_task
+@single_instance()
 def send_evening_review_reminders():
     """Send evening review reminders at 9:30 PM"""
-    now = timezone.now()
-    if now.hour == 21 and now.minute == 30:
+    now = timezone.localtime()
+    if now.hour == 21:
         users = User.objects.filter(is_active=True)
+        preferences = PreferenceMap.load()
         
         for user in users:
-            pref = getattr(user, 'notification_preferences', None)
+            pref = preferences.get(user.id)
             if pref and not pref.push_enabled:
                 continue
             
@@ -248,54 +255,56 @@ def send_evening_review_reminders():
                 )
 
 @shared_task
+@single_instance()
 def check_task_deadlines():
-    """Check for upcoming task deadlines"""
-    now = timezone.now()
-    tomorrow = now + timedelta(days=1)
-    day_after = now + timedelta(days=2)
+    """Send each user one digest of their open tasks due today and tomorrow"""
+    today = timezone.localdate()
+    tomorrow = today + timedelta(days=1)
+    priority_labels = dict(Task.PRIORITY_CHOICES)
     
-    # Tasks due tomorrow
-    upcoming_tasks = Task.objects.filter(
-        due_date=tomorrow.date(),
+    # One query over the (due_date, status) index, streamed in user order
+    due_tasks = Task.objects.filter(
+        due_date__in=[today, tomorrow],
         status__in=['todo', 'in_progress']
-    )
+    ).order_by('user_id', 'due_date').values_list('user_id', 'title', 'due_date', 'priority')
     
-    for task in upcoming_tasks:
-        title = "📅 Task Deadline Tomorrow"
-        message = f"'{task.title}' is due tomorrow. Don't forget to complete it!"
+    digests = []
+    for user_id, tasks in groupby(due_tasks.iterator(chunk_size=DIGEST_BATCH_SIZE), key=itemgetter(0)):
+        due_today, due_tomorrow = [], []
+        for _, task_title, due_date, priority in tasks:
+            line = f"• {task_title} ({priority_labels.get(priority, priority)})"
+            if due_date == today:
+                due_today.append((priority != 'high', line))
+            else:
+                due_tomorrow.append((priority != 'high', line))
         
-        NotificationEngine.create_in_app_notification(
-            user=task.user,
-            title=title,
-            message=message,
-            notification_type='deadline',
-            related_task=task
-        )
-    
-    # Critical tasks due today
-    critical_tasks = Task.objects.filter(
-        due_date=now.date(),
-        status__in=['todo', 'in_progress'],
-        priority__in=['high', 'critical']
-    )
-    
-    for task in critical_tasks:
-        title = "🚨 Critical Task Due Today"
-        message = f"'{task.title}' is due today! Priority: {task.get_priority_display()}"
+        urgent = any(not is_routine for is_routine, _ in due_today)
+        sections = []
+        if due_today:
+            sections.append("Due today:\n" + "\n".join(line for _, line in sorted(due_today)))
+        if due_tomorrow:
+            sections.append("Due tomorrow:\n" + "\n".join(line for _, line in sorted(due_tomorrow)))
         
-        NotificationEngine.create_in_app_notification(
-            user=task.user,
-            title=title,
-            message=message,
+        digests.append(NotificationEngine.build_notification(
+            user=user_id,
+            title="🚨 High Priority Tasks Due Today" if urgent else "📅 Upcoming Task Deadlines",
+            message="\n\n".join(sections),
             notification_type='deadline',
-            related_task=task,
-            priority=5
-        )
+            priority=5 if urgent else 3,
+            dedupe_key=NotificationEngine.dedupe_key(user_id, 'deadline_digest', '', today)
+        ))
+        
+        if len(digests) >= DIGEST_BATCH_SIZE:
+            NotificationEngine.bulk_create_in_app_notifications(digests)
+            digests = []
+    
+    NotificationEngine.bulk_create_in_app_notifications(digests)
 
 @shared_task
+@single_instance()
 def send_motivational_messages():
     """Send random motivational messages throughout the day"""
-    now = timezone.now()
+    now = timezone.localtime()
     
     # Only send during active hours (8 AM - 8 PM)
     if 8 <= now.hour <= 20:
@@ -310,72 +319,73 @@ def send_motivational_messages():
         import random
         message = random.choice(motivational_messages)
         
-        # Send to random active users (limit to 10% of users to avoid spam)
-        users = User.objects.filter(is_active=True)
-        sample_size = max(1, len(users) // 10)
-        selected_users = random.sample(list(users), sample_size)
+        # Send to random active users (limit to 10% of users to avoid spam), drawing each
+        # of the day's runs from a different band so nobody is picked twice in a day
+        slot = max(0, sum(1 for hour in MOTIVATIONAL_HOURS if hour <= now.hour) - 1)
+        sampler = RecipientSampler('motivational', slots=len(MOTIVATIONAL_HOURS), day=now.date())
+        user_ids = sampler.sample_queryset(User.objects.filter(is_active=True), 0.1, slot)
         
-        for user in selected_users:
-            NotificationEngine.create_in_app_notification(
-                user=user,
+        NotificationEngine.bulk_create_in_app_notifications([
+            NotificationEngine.build_notification(
+                user=user_id,
                 title="💪 Motivational Boost",
                 message=message,
-                notification_type='motivational'
+                notification_type='motivational',
+                dedupe_key=NotificationEngine.dedupe_key(user_id, 'motivational', '', now.date())
             )
+            for user_id in user_ids
+        ])
 
 @shared_task
+@single_instance()
 def check_habit_completions():
-    """Check and notify about habit streaks"""
-    now = timezone.now()
+    """Check and notify about habit streaks in a single scan over active habits"""
+    now = timezone.localtime()
     today = now.date()
+    send_reminders = now.hour == 20  # 8 PM reminder
     
-    from core.models import Habit, HabitCompletion
+    habits = Habit.objects.filter(
+        is_active=True,
+        user__is_active=True
+    ).values_list('id', 'user_id', 'name', 'current_streak', 'last_completed_on')
     
-    users = User.objects.filter(is_active=True)
-    
-    for user in users:
-        habits = Habit.objects.filter(user=user, is_active=True)
+    pending = []
+    for habit_id, user_id, name, current_streak, last_completed_on in habits.iterator(chunk_size=DIGEST_BATCH_SIZE):
+        streak = Habit.streak_as_of(current_streak, last_completed_on, today)
         
-        for habit in habits:
-            # Check if habit was completed today
-            today_completion = HabitCompletion.objects.filter(
-                habit=habit,
-                date=today
-            ).first()
-            
-            if not today_completion or not today_completion.completed:
-                # Send reminder for incomplete habits
-                if now.hour == 20:  # 8 PM reminder
-                    title = "💪 Habit Reminder"
-                    message = f"Don't forget to complete: {habit.name}"
-                    
-                    NotificationEngine.create_in_app_notification(
-                        user=user,
-                        title=title,
-                        message=message,
-                        notification_type='reminder'
-                    )
-            
-            # Check for streak achievements
-            if habit.current_streak > 0 and habit.current_streak % 7 == 0:
-                title = "🔥 Streak Achievement!"
-                message = f"Amazing! You've maintained '{habit.name}' for {habit.current_streak} days!"
-                
-                NotificationEngine.create_in_app_notification(
-                    user=user,
-                    title=title,
-                    message=message,
-                    notification_type='achievement'
-                )
+        if last_completed_on != today and send_reminders:
+            # Send reminder for incomplete habits
+            pending.append(NotificationEngine.build_notification(
+                user=user_id,
+                title="💪 Habit Reminder",
+                message=f"Don't forget to complete: {name}",
+                notification_type='reminder',
+                dedupe_key=NotificationEngine.dedupe_key(user_id, 'habit_reminder', habit_id, today)
+            ))
+        
+        # Check for streak achievements; the start date tells a new streak of the same length apart
+        if streak > 0 and streak % 7 == 0:
+            started_on = last_completed_on - timedelta(days=streak - 1)
+            pending.append(NotificationEngine.build_notification(
+                user=user_id,
+                title="🔥 Streak Achievement!",
+                message=f"Amazing! You've maintained '{name}' for {streak} days!",
+                notification_type='achievement',
+                dedupe_key=NotificationEngine.dedupe_key(user_id, 'habit_streak', f'{habit_id}:{streak}', started_on)
+            ))
+        
+        if len(pending) >= DIGEST_BATCH_SIZE:
+            NotificationEngine.bulk_create_in_app_notifications(pending)
+            pending = []
+    
+    NotificationEngine.bulk_create_in_app_notifications(pending)
+
+@shared_task
+@single_instance()
+def reconcile_unread_counts():
+    """Correct drift in the denormalized unread notification counters"""
+    return UnreadCounter.reconcile()
 
 def should_send_reminder(preference, activity_type):
     """Check if user wants reminders for this activity type"""
-    reminder_map = {
-        'lecture': preference.enable_lecture_reminders,
-        'lab': preference.enable_lab_reminders,
-        'study': preference.enable_study_reminders,
-        'workout': preference.enable_workout_reminders,
-        'meal': preference.enable_meal_reminders,
-        'relationship': preference.enable_relationship_reminders,
-    }
-    return reminder_map.get(activity_type, True)
\ No newline at end of file
+    return preference.activity_reminders.get(activity_type, True)
\ No newline at end of file
@@ -1,3 +1,141 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from celery.exceptions import SoftTimeLimitExceeded
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-# Create your tests here.
+from .consumers import NotificationConsumer
+from .counters import UnreadCounter
+from .delivery import DeliveryQueue
+from .models import Notification
+from .realtime import notification_group_name
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class NotificationConsumerCoalescingTests(TransactionTestCase):
+    BURST = 25
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='burst', password='x')
+        # Seed the unread counter so every later count is a single query
+        UnreadCounter.get(self.user.id)
+
+    async def connect(self, path='/ws/notifications/'):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), path)
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        initial = json.loads(await communicator.receive_from())
+        self.assertEqual(initial['type'], 'initial_count')
+        return communicator
+
+    async def send_burst(self):
+        channel_layer = get_channel_layer()
+        for index in range(self.BURST):
+            await channel_layer.group_send(notification_group_name(self.user.id), {
+                'type': 'notification_message',
+                'notification': {'id': str(index), 'title': f'Notification {index}'},
+            })
+
+    async def receive_frames(self, communicator, timeout=0.5):
+        frames = []
+        while not await communicator.receive_nothing(timeout=timeout):
+            frames.append(json.loads(await communicator.receive_from()))
+        return frames
+
+    async def burst(self, path):
+        """Connect, send a burst to the user's group and collect the frames it produces"""
+        communicator = await self.connect(path)
+        await self.send_burst()
+        frames = await self.receive_frames(communicator)
+        await communicator.disconnect()
+        return frames
+
+    def test_burst_is_sent_as_one_frame_with_one_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            frames = async_to_sync(self.burst)('/ws/notifications/?coalesce_ms=100')
+
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0]['type'], 'new_notifications')
+        self.assertEqual(frames[0]['count'], self.BURST)
+        self.assertEqual([item['id'] for item in frames[0]['notifications']], [str(index) for index in range(self.BURST)])
+        self.assertIn('unread_count', frames[0])
+        # One count on connect, one for the whole burst
+        self.assertEqual(len(queries), 2)
+
+    def test_zero_window_sends_each_notification_immediately(self):
+        with CaptureQueriesContext(connection) as queries:
+            frames = async_to_sync(self.burst)('/ws/notifications/?coalesce_ms=0')
+
+        self.assertEqual(len(frames), self.BURST)
+        self.assertTrue(all(frame['count'] == 1 for frame in frames))
+        self.assertEqual(len(queries), self.BURST + 1)
+
+    async def test_window_can_be_changed_on_an_open_connection(self):
+        communicator = await self.connect('/ws/notifications/?coalesce_ms=0')
+        await communicator.send_to(text_data=json.dumps({'type': 'configure', 'coalesce_ms': 100}))
+        await asyncio.sleep(0.05)
+
+        await self.send_burst()
+        frames = await self.receive_frames(communicator)
+
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0]['count'], self.BURST)
+
+        await communicator.disconnect()
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class DeliveryQueueFlushTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.users = [User.objects.create_user(username=f'flush{index}', password='x') for index in range(3)]
+        for user in self.users:
+            for index in range(2):
+                Notification.objects.create(
+                    user=user, title=f'{user.username} {index}', message='m',
+                    channels=['in_app', 'push'], scheduled_for=self.now - timedelta(minutes=1)
+                )
+
+    def test_each_user_gets_one_batch(self):
+        with mock.patch('notifications.tasks.NotificationEngine.send_push_notification') as push:
+            self.assertEqual(DeliveryQueue.flush(self.now), 6)
+
+        self.assertEqual(sorted(call.args[0].username for call in push.call_args_list), ['flush0', 'flush1', 'flush2'])
+        self.assertFalse(Notification.objects.filter(is_sent=False).exists())
+
+    def test_interrupted_flush_does_not_resend(self):
+        sent = []
+
+        def time_out_on_second_user(user, title, message, data=None):
+            if sent:
+                raise SoftTimeLimitExceeded()
+            sent.append(user.username)
+
+        with mock.patch.object(DeliveryQueue, 'USERS_PER_CHUNK', 1), \
+                mock.patch('notifications.tasks.NotificationEngine.send_push_notification', side_effect=time_out_on_second_user):
+            with self.assertRaises(SoftTimeLimitExceeded):
+                DeliveryQueue.flush(self.now)
+
+        with mock.patch('notifications.tasks.NotificationEngine.send_push_notification') as push:
+            DeliveryQueue.flush(self.now)
+
+        resent = [call.args[0].username for call in push.call_args_list]
+        self.assertEqual(sent, ['flush0'])
+        # The delivered user and the one cut off mid-send are both claimed; only the untouched user is left
+        self.assertEqual(resent, ['flush2'])
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.db.models import Q
+from django.utils import timezone
+import logging
+
+from core.models import JobCheckpoint, Schedule
+from .delivery import DeliveryQueue
+from .preferences import PreferenceMap
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_TYPE_LABELS = dict(Schedule.ACTIVITY_TYPES)
+
+
+class MinuteTicker:
+    """All minute-granular notification work, driven by one beat entry.
+
+    Each tick works out which wall-clock minutes are due from a JobCheckpoint
+    watermark rather than from the time the task happens to start, so a tick
+    that runs late or early never skips or repeats a minute, and minutes missed
+    while beat or the workers were down are caught up (up to MAX_CATCH_UP).
+    The schedules starting in those minutes, plus the lead-time window for
+    reminders, are loaded once into a snapshot that every job reads from;
+    dedupe keys keep a retried tick from notifying twice. Push/email delivery
+    is not done here: the tick task hands it to flush_deferred_notifications
+    so slow gateways never eat into the tick's time limit.
+    """
+
+    CHECKPOINT_NAME = 'minute_tick'
+    MAX_CATCH_UP = 15  # minutes; anything older is stale and skipped
+
+    SNAPSHOT_FIELDS = ['id', 'user_id', 'title', 'day', 'start_time', 'activity_type', 'location']
+
+    def run(self, now=None):
+        """Process every due minute up to now, returning the number of notifications created"""
+        current = _floor_minute(timezone.localtime(now))
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=self.CHECKPOINT_NAME)
+
+        minutes = self.due_minutes(checkpoint.watermark, current)
+        created = 0
+        if minutes:
+            preferences = PreferenceMap.load()
+            lead_times = self.users_by_lead_time(preferences)
+            snapshot = self.snapshot(minutes, max(lead_times, default=0))
+            created = self._notify(minutes, snapshot, preferences, lead_times)
+
+            checkpoint.watermark = minutes[-1]
+            checkpoint.state = {'minutes': len(minutes), 'notifications': created}
+            checkpoint.save()
+
+        return created
+
+    def due_minutes(self, watermark, current):
+        """Minutes after the last processed one, oldest first, capped at MAX_CATCH_UP"""
+        if watermark is None:
+            return [current]
+
+        first = _floor_minute(timezone.localtime(watermark)) + timedelta(minutes=1)
+        oldest = current - timedelta(minutes=self.MAX_CATCH_UP - 1)
+        if first < oldest:
+            logger.warning(f"Minute tick fell behind; skipping {first:%H:%M}-{oldest - timedelta(minutes=1):%H:%M}")
+            first = oldest
+
+        minutes = []
+        while first <= current:
+            minutes.append(first)
+            first += timedelta(minutes=1)
+        return minutes
+
+    @staticmethod
+    def users_by_lead_time(preferences):
+        """{reminder lead time in minutes: user ids using it}"""
+        groups = defaultdict(set)
+        for user_id, pref in preferences.items():
+            groups[pref.reminder_lead_time].add(user_id)
+        return groups
+
+    def snapshot(self, minutes, max_lead_time=0):
+        """Active schedules starting in the window, keyed by (day name, 'HH:MM')"""
+        end = minutes[-1] + timedelta(minutes=max_lead_time)
+
+        # One range per calendar day the window touches (two around midnight)
+        window = Q()
+        day = minutes[0]
+        while day.date() <= end.date():
+            start_time = minutes[0].time() if day.date() == minutes[0].date() else datetime.min.time()
+            end_time = end.time().replace(second=59) if day.date() == end.date() else datetime.max.time()
+            window |= Q(day=day.strftime('%A'), start_time__gte=start_time, start_time__lte=end_time)
+            day = _start_of_next_day(day)
+
+        activities = defaultdict(list)
+        rows = Schedule.objects.filter(window, is_active=True, user__is_active=True).values_list(*self.SNAPSHOT_FIELDS)
+        for row in rows.iterator():
+            activity = dict(zip(self.SNAPSHOT_FIELDS, row))
+            activities[(activity['day'], activity['start_time'].strftime('%H:%M'))].append(activity)
+        return activities
+
+    def _notify(self, minutes, snapshot, preferences, lead_times):
+        from .tasks import NotificationEngine, should_send_reminder
+
+        notifications = []
+        for minute in minutes:
+            for activity in snapshot.get(_slot(minute), []):
+                notifications.append(NotificationEngine.build_notification(
+                    user=activity['user_id'],
+                    title=f"⏰ Now: {activity['title']}",
+                    message=f"Time for {ACTIVITY_TYPE_LABELS.get(activity['activity_type'], activity['activity_type'])}! Focus and do your best. 🎯",
+                    notification_type='reminder',
+                    related_model='schedule',
+                    related_id=activity['id'],
+                    dedupe_key=NotificationEngine.dedupe_key(activity['user_id'], 'activity_start', activity['id'], minute.date())
+                ))
+
+            for lead_time, user_ids in lead_times.items():
+                starts_at = minute + timedelta(minutes=lead_time)
+                for activity in snapshot.get(_slot(starts_at), []):
+                    if activity['user_id'] not in user_ids:
+                        continue
+                    pref = preferences.get(activity['user_id'])
+                    if not should_send_reminder(pref, activity['activity_type']):
+                        continue
+
+                    notifications.append(NotificationEngine.build_notification(
+                        user=activity['user_id'],
+                        title=f"🕒 Coming Up: {activity['title']}",
+                        message=f"Starts in {lead_time} minutes at {activity['location'] or 'your scheduled location'}",
+                        notification_type='reminder',
+                        channels=DeliveryQueue.channels_for(pref),
+                        preference=pref,
+                        related_model='schedule',
+                        related_id=activity['id'],
+                        dedupe_key=NotificationEngine.dedupe_key(activity['user_id'], 'activity_reminder', activity['id'], starts_at.date())
+                    ))
+
+        return len(NotificationEngine.bulk_create_in_app_notifications(notifications))
+
+
+def _floor_minute(moment):
+    return moment.replace(second=0, microsecond=0)
+
+
+def _start_of_next_day(moment):
+    return (moment + timedelta(days=1)).replace(hour=0, minute=0)
+
+
+def _slot(moment):
+    return (moment.strftime('%A'), moment.strftime('%H:%M'))
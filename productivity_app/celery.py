@@ -15,24 +15,51 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
-# Comprehensive beat schedule
+# The one beat schedule (settings.CELERY_BEAT_SCHEDULE is not used). Minute-granular
+# work all runs from the single `tick` entry, which tracks the last minute it handled
+# so late or missed runs catch up instead of drifting.
 app.conf.beat_schedule = {
+    # Minute ticker: activity starts, lead-time reminders, deferred push/email delivery
+    'minute-tick': {
+        'task': 'notifications.tasks.tick',
+        'schedule': crontab(minute='*'),
+    },
+    
     # Morning routines
     'morning-planning-notifications': {
         'task': 'notifications.tasks.send_morning_planning_notifications',
         'schedule': crontab(hour=5, minute=45),
     },
     
-    # Activity reminders (every minute for precision)
-    'activity-reminders': {
-        'task': 'notifications.tasks.schedule_activity_reminders', 
-        'schedule': crontab(minute='*'),
+    # Unread counter reconciliation (hourly)
+    'reconcile-unread-counts': {
+        'task': 'notifications.tasks.reconcile_unread_counts',
+        'schedule': crontab(minute=30),
     },
     
-    # Activity start notifications
-    'activity-start-notifications': {
-        'task': 'notifications.tasks.send_activity_start_notifications',
-        'schedule': crontab(minute='*'),
+    # Schedule conflicts (users who changed something since the last scan)
+    'check-schedule-conflicts': {
+        'task': 'core.tasks.check_schedule_conflicts',
+        'schedule': crontab(minute='*/15'),
+    },
+    
+    # Productivity rollups (hourly, only users with new progress)
+    'update-productivity-analytics': {
+        'task': 'core.tasks.update_productivity_analytics',
+        'schedule': crontab(minute=15),
+    },
+    
+    # Smart suggestions (hourly, only users whose data changed)
+    'generate-smart-suggestions': {
+        'task': 'core.tasks.generate_smart_suggestions',
+        'schedule': crontab(minute=45),
+    },
+    
+    # Expired task results, pruned in chunks. Named after Celery's built-in
+    # backend_cleanup entry so beat does not also schedule the unbounded one.
+    'celery.backend_cleanup': {
+        'task': 'core.tasks.prune_task_results',
+        'schedule': crontab(hour=4, minute=0),
     },
     
     # Evening routines
@@ -53,35 +80,9 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=20, minute=0),  # 8:00 PM
     },
     
-    # Motivational messages (3 times daily)
-    'motivational-messages-1': {
+    # Motivational messages (3 times daily, see MOTIVATIONAL_HOURS)
+    'motivational-messages': {
         'task': 'notifications.tasks.send_motivational_messages',
-        'schedule': crontab(hour=10, minute=0),  # 10:00 AM
-    },
-    'motivational-messages-2': {
-        'task': 'notifications.tasks.send_motivational_messages', 
-        'schedule': crontab(hour=14, minute=0),  # 2:00 PM
-    },
-    'motivational-messages-3': {
-        'task': 'notifications.tasks.send_motivational_messages',
-        'schedule': crontab(hour=17, minute=0),  # 5:00 PM
-    },
-    
-    # Weekly review (Sunday 2:00 PM)
-    'weekly-review-reminder': {
-        'task': 'notifications.tasks.send_weekly_review_reminder',
-        'schedule': crontab(day_of_week=0, hour=14, minute=0),
-    },
-    
-    # Relationship time reminders (Daily 9:00 PM)
-    'relationship-reminders': {
-        'task': 'notifications.tasks.send_relationship_reminder',
-        'schedule': crontab(hour=21, minute=0),
-    },
-    
-    # Daily notification scheduler (6:00 AM)
-    'daily-notification-scheduler': {
-        'task': 'notifications.tasks.schedule_daily_notifications',
-        'schedule': crontab(hour=6, minute=0),
+        'schedule': crontab(hour='10,14,17', minute=0),
     },
-}
\ No newline at end of file
+}
@@ -4,6 +4,7 @@ Generated by 'django-admin startproject' using Django 5.2.6.
 """
 
 from pathlib import Path
+from kombu import Queue
 import os
 from datetime import timedelta
 
@@ -183,20 +184,72 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Africa/Nairobi'
-CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
-# Celery Beat Schedule
-CELERY_BEAT_SCHEDULE = {
-    'send-scheduled-notifications': {
-        'task': 'notifications.tasks.send_scheduled_notifications',
-        'schedule': 60.0,  # Every 60 seconds
-    },
-    'generate-smart-suggestions': {
-        'task': 'core.tasks.generate_smart_suggestions',
-        'schedule': 3600.0,  # Every hour
-    },
+# Results: fire-and-forget tasks (everything on the beat schedule) store nothing.
+# Tasks whose return value is read opt in with @shared_task(ignore_result=False);
+# failures are still recorded. Stored rows expire and are pruned in chunks by
+# core.tasks.prune_task_results.
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_STORE_ERRORS_EVEN_IF_IGNORED = True
+CELERY_RESULT_EXPIRES = timedelta(days=1)
+
+# Queues: latency-sensitive per-minute work never waits behind heavy batch jobs.
+# Workers are started per queue (see start_comprehensive.sh / docker-compose.yml).
+CELERY_TASK_QUEUES = (
+    Queue('realtime'),
+    Queue('default'),
+    Queue('heavy'),
+)
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Redis emulates priorities with sub-queues; 0 is the highest priority
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'queue_order_strategy': 'priority',
+}
+CELERY_TASK_DEFAULT_PRIORITY = 5
+
+CELERY_TASK_ROUTES = {
+    # Realtime: the minute ticker and live pushes
+    'notifications.tasks.tick': {'queue': 'realtime', 'priority': 0},
+    'core.tasks.refresh_live_analytics': {'queue': 'realtime', 'priority': 4},
+    
+    # Heavy: set-based scans, rollups, retention and exports
+    'core.tasks.generate_smart_suggestions': {'queue': 'heavy', 'priority': 5},
+    'core.tasks.update_productivity_analytics': {'queue': 'heavy', 'priority': 5},
+    'core.tasks.check_schedule_conflicts': {'queue': 'heavy', 'priority': 6},
+    'notifications.tasks.reconcile_unread_counts': {'queue': 'heavy', 'priority': 7},
+    'core.tasks.backup_user_data': {'queue': 'heavy', 'priority': 8},
+    'core.tasks.cleanup_old_data': {'queue': 'heavy', 'priority': 9},
+    'core.tasks.prune_task_results': {'queue': 'heavy', 'priority': 9},
+    
+    # Push/email delivery waits on external gateways, so it stays off the realtime queue
+    'notifications.tasks.flush_deferred_notifications': {'queue': 'default', 'priority': 1},
+    
+    # Everything else (daily digests, motivational messages, ...) goes to the default queue
 }
 
+# Per-task limits; periodic tasks also hold a single_instance lock for their time_limit
+CELERY_TASK_SOFT_TIME_LIMIT = 5 * 60
+CELERY_TASK_TIME_LIMIT = 6 * 60
+CELERY_TASK_ANNOTATIONS = {
+    'notifications.tasks.tick': {'soft_time_limit': 45, 'time_limit': 55},
+    'notifications.tasks.flush_deferred_notifications': {'soft_time_limit': 4 * 60, 'time_limit': 5 * 60},
+    'core.tasks.refresh_live_analytics': {'soft_time_limit': 20, 'time_limit': 30},
+    'core.tasks.generate_smart_suggestions': {'soft_time_limit': 15 * 60, 'time_limit': 20 * 60},
+    'core.tasks.update_productivity_analytics': {'soft_time_limit': 15 * 60, 'time_limit': 20 * 60},
+    'core.tasks.check_schedule_conflicts': {'soft_time_limit': 10 * 60, 'time_limit': 14 * 60},
+    'core.tasks.backup_user_data': {'rate_limit': '10/m', 'soft_time_limit': 10 * 60, 'time_limit': 15 * 60},
+    'core.tasks.cleanup_old_data': {'soft_time_limit': 30 * 60, 'time_limit': 40 * 60},
+    'core.tasks.prune_task_results': {'soft_time_limit': 10 * 60, 'time_limit': 14 * 60},
+}
+
+# Per-task runtime/query histograms (see core.telemetry, /metrics/tasks/ and manage.py task_metrics)
+CELERY_TELEMETRY_ENABLED = os.environ.get('CELERY_TELEMETRY_ENABLED', 'True').lower() == 'true'
+
+# The beat schedule lives in productivity_app/celery.py
+
 # -----------------------------------------
 # CORS Configuration
 # -----------------------------------------
@@ -222,6 +275,8 @@ EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True').lower() == 'true'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@plannerdeep.com')
+# Seconds before a stuck SMTP connection gives up, so deferred delivery cannot hang
+EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', 10))
 
 # -----------------------------------------
 # Logging Configuration
@@ -293,6 +348,27 @@ WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY', 'd10d7bf01e10146ffe0f12634e9
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 SPACY_MODEL = os.environ.get('SPACY_MODEL', 'en_core_web_sm')
 
+# Notification delivery: push/email generated within this window go out as one batch
+NOTIFICATION_COALESCE_SECONDS = int(os.environ.get('NOTIFICATION_COALESCE_SECONDS', 120))
+
+# Websocket notification frames: default per-connection buffering window (clients may override)
+NOTIFICATION_WS_COALESCE_MS = int(os.environ.get('NOTIFICATION_WS_COALESCE_MS', 200))
+
+# Chat read receipts: mark_read messages within this window advance the read watermark once
+CHAT_READ_COALESCE_MS = int(os.environ.get('CHAT_READ_COALESCE_MS', 1000))
+
+# Chat fan-out: typing indicators repeat at most this often; joins/leaves are batched into one presence snapshot
+CHAT_TYPING_THROTTLE_MS = int(os.environ.get('CHAT_TYPING_THROTTLE_MS', 3000))
+CHAT_PRESENCE_INTERVAL_MS = int(os.environ.get('CHAT_PRESENCE_INTERVAL_MS', 2000))
+
+# Notification retention: rows older than this are purged in chunks by cleanup_old_data
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 30))
+NOTIFICATION_ARCHIVE_ENABLED = os.environ.get('NOTIFICATION_ARCHIVE_ENABLED', 'False').lower() == 'true'
+NOTIFICATION_ARCHIVE_DIR = BASE_DIR / 'archives' / 'notifications'
+
+# Per-user .ndjson.gz exports written by backup_user_data
+USER_EXPORT_DIR = BASE_DIR / 'exports'
+
 # File upload settings
 MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
 FILE_UPLOAD_PERMISSIONS = 0o644
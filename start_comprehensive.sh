@@ -6,9 +6,11 @@ echo "🚀 STARTING COMPREHENSIVE PRODUCTIVITY APP..."
 echo "📦 Starting Redis..."
 redis-server --daemonize yes
 
-# Start Celery Worker
-echo "⚡ Starting Celery Worker..."
-celery -A productivity_app worker --loglevel=info --concurrency=4 &
+# Start Celery Workers (one per queue so reminders never wait behind analytics)
+echo "⚡ Starting Celery Workers..."
+celery -A productivity_app worker -Q realtime -n realtime@%h --loglevel=info --concurrency=2 --prefetch-multiplier=1 &
+celery -A productivity_app worker -Q default -n default@%h --loglevel=info --concurrency=1 --prefetch-multiplier=1 &
+celery -A productivity_app worker -Q heavy -n heavy@%h --loglevel=info --concurrency=1 --prefetch-multiplier=1 &
 
 # Start Celery Beat
 echo "⏰ Starting Celery Beat Scheduler..."